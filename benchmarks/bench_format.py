@@ -0,0 +1,56 @@
+"""Micro-benchmark: tp_format helpers vs the row-wise lambdas they replace.
+
+    python benchmarks/bench_format.py [rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tp_format  # noqa: E402
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows=1_000_000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "DATE_GROUP": rng.integers(0, 365, rows),
+        "COUNT": rng.integers(1, 500, rows),
+        # two-decimal averages repeat a lot, like the page outputs do
+        "VOC": rng.integers(0, 1000, rows) / 100,
+        "FLU": rng.integers(0, 1000, rows) / 100,
+    })
+
+    cases = [
+        ("group share", lambda: df.groupby("DATE_GROUP")["COUNT"].transform(lambda x: x / x.sum() * 100),
+         lambda: tp_format.group_share(df, "DATE_GROUP", "COUNT")),
+        ("format 1 column", lambda: df["VOC"].apply(lambda x: f"{x:.2f}"),
+         lambda: tp_format.format_numbers(df["VOC"])),
+        ("format 2 columns", lambda: [df[c].apply(lambda x: f"{x:.2f}") for c in ["VOC", "FLU"]],
+         lambda: tp_format.format_numbers(df[["VOC", "FLU"]])),
+    ]
+    print(f"{rows:,} rows")
+    print(f"{'case':<18}{'lambda s':>10}{'vector s':>10}{'speedup':>9}")
+    for name, old, new in cases:
+        t_old, t_new = best_of(old), best_of(new)
+        print(f"{name:<18}{t_old:>10.3f}{t_new:>10.3f}{t_old / t_new:>8.1f}x")
+
+    # both paths must agree
+    share = tp_format.group_share(df, "DATE_GROUP", "COUNT")
+    assert np.allclose(share, cases[0][1]())
+    assert tp_format.format_numbers(df["VOC"]).equals(cases[1][1]())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
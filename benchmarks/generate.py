@@ -0,0 +1,167 @@
+"""Synthetic Talkpush exports for benchmarking the dashboard.
+
+    python benchmarks/generate.py --rows 1M --out /tmp/tp_bench
+
+Writes TP_raw_data1.csv, TalkpushCI_data_fetch.csv, TalkpushCI_SC1.csv,
+Failure_Reasons.csv and Folder_Logs.csv with `--rows` rows each (10k, 1M,
+10M or any integer). Rows are dated over the last `--days` days in
+chronological order, like the real exports, and category columns follow a
+skewed (Zipf-like) distribution with cardinalities close to production.
+Files are written in chunks, so 10M rows do not need 10M rows of memory.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+CHUNK = 500_000
+
+CEFR = ["A1", "A2", "A2+", "B1", "B1+", "B2", "B2+", "C1"]
+CEFR_WEIGHTS = [0.01, 0.02, 0.05, 0.3, 0.25, 0.3, 0.05, 0.02]
+FAILED_REASONS = ["Poor communication skills", "Stability or reliability issue", "Reading off a script",
+                  "Competitiveness issue", "Flexibility or adaptability issue", "Insufficient English Level",
+                  "Others", "Willingness to learn issue", "Attrition risk", "Proximity concerns"]
+FAILED_WEIGHTS = [0.62, 0.09, 0.09, 0.085, 0.065, 0.017, 0.011, 0.01, 0.004, 0.008]
+
+
+def _zipf_choice(rng, values, n, skew=1.1, weights=None):
+    if weights is None:
+        weights = 1 / np.arange(1, len(values) + 1) ** skew
+    weights = np.asarray(weights, dtype="float64")
+    return np.asarray(values, dtype=object)[rng.choice(len(values), n, p=weights / weights.sum())]
+
+
+def _scores(rng, n, mean, sd=0.7):
+    return np.clip(np.round(rng.normal(mean, sd, n), 1), 0, 10)
+
+
+def _days(rng, start, n, first, per_chunk_days):
+    """Chronological day stamps for one chunk of rows."""
+    return pd.DatetimeIndex(np.sort(first + pd.to_timedelta(start + rng.integers(0, per_chunk_days, n), unit="D")))
+
+
+def tp_raw(rng, days):
+    n = len(days)
+    overall = _scores(rng, n, 7.2)
+    overall[rng.random(n) < 0.15] = 0  # invited but not scored yet
+    return pd.DataFrame({
+        "DATE_DAY": days.strftime("%Y-%m-%d"),
+        "CAMP_SITE": _zipf_choice(rng, [f"Site {i}" for i in range(12)], n),
+        "NEW_SOURCE": _zipf_choice(rng, [f"Source {i}" for i in range(25)], n),
+        "TALKSCORE_CEFR": _zipf_choice(rng, CEFR, n, weights=CEFR_WEIGHTS),
+        "TALKSCORE_OVERALL": overall,
+        "TALKSCORE_VOCAB": _scores(rng, n, 6.8),
+        "TALKSCORE_FLUENCY": _scores(rng, n, 7.4),
+        "TALKSCORE_GRAMMAR": _scores(rng, n, 7.2),
+        "TALKSCORE_PRONUNCIATION": _scores(rng, n, 8.4),
+        "TEST_COMPLETED": (rng.random(n) < 0.7).astype(int),
+        "FOR_TS_REVIEW": (rng.random(n) < 0.05).astype(int),
+    })
+
+
+def candidate_info(rng, days, first_id):
+    n = len(days)
+    return pd.DataFrame({
+        "RECORDID": np.arange(first_id, first_id + n),
+        "INVITATIONDT": (days + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+        "CAMPAIGNTITLE": _zipf_choice(rng, [f"Campaign {i}" for i in range(800)], n),
+        "SOURCE": _zipf_choice(rng, [f"Source {i}" for i in range(40)], n),
+        "ASSIGNEDMANAGER": _zipf_choice(rng, [f"manager{i}@iqor.com" for i in range(300)], n),
+        "FOLDER": _zipf_choice(rng, [f"Folder {i}" for i in range(60)], n),
+        "COMPLETIONMETHOD": _zipf_choice(rng, ["web", "sms", "messenger", "whatsapp", "phone"], n),
+        "REPEATAPPLICATION": np.where(rng.random(n) < 0.2, "t", "f"),
+        "CAMPAIGN_TYPE": _zipf_choice(rng, [f"Type {i}" for i in range(8)], n),
+        "CAMPAIGN_SITE": _zipf_choice(rng, [f"Site {i}" for i in range(12)], n),
+    })
+
+
+def talkscore(rng, days, first_id):
+    n = len(days)
+    overall = _scores(rng, n, 7.2)
+    overall[rng.random(n) < 0.15] = 0
+    reasons = _zipf_choice(rng, [f"Reason {i}" for i in range(20)], n)
+    reasons[rng.random(n) < 0.6] = None  # most candidates are not rejected
+    return pd.DataFrame({
+        "RECORDID": np.arange(first_id, first_id + n),
+        "INVITATIONDT_UTC": (days + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+        "REJECTED_REASON": reasons,
+        "TALKSCORE_VOCAB": _scores(rng, n, 6.8),
+        "TALKSCORE_FLUENCY": _scores(rng, n, 7.4),
+        "TALKSCORE_GRAMMAR": _scores(rng, n, 7.2),
+        "TALKSCORE_COMPREHENSION": _scores(rng, n, 2.0, 2.4),
+        "TALKSCORE_PRONUNCIATION": _scores(rng, n, 8.4),
+        "TALKSCORE_OVERALL": overall,
+    })
+
+
+def failure_reasons(rng, days):
+    n = len(days)
+    return pd.DataFrame({
+        "FAILED_REASON": _zipf_choice(rng, FAILED_REASONS, n, weights=FAILED_WEIGHTS),
+        "CEFR": _zipf_choice(rng, CEFR, n, weights=CEFR_WEIGHTS),
+        "VOC": _scores(rng, n, 6.8),
+        "FLU": _scores(rng, n, 7.4),
+        "GRAM": _scores(rng, n, 7.2),
+        "COMP": _scores(rng, n, 2.0, 2.4),
+        "PRON": _scores(rng, n, 8.4),
+        "OVERALL": _scores(rng, n, 7.2),
+        "DATE_DAY": days.strftime("%Y-%m-%d"),
+    })
+
+
+def folder_logs(rng, days):
+    n = len(days)
+    managers = [f"manager{i}@iqor.com" for i in range(400)]
+    emails = _zipf_choice(rng, managers, n)
+    tagged = rng.random(n) < 0.1  # "+tag" aliases of the same mailbox
+    emails[tagged] = [e.replace("@", f"+{t}@") for e, t in zip(emails[tagged], rng.integers(0, 5, tagged.sum()))]
+    emails[rng.random(n) < 0.1] = None  # moves made by automations
+    moved_by = np.where(pd.isna(emails), "System", "Manager")
+    return pd.DataFrame({
+        "DATE_DAY": days.strftime("%Y-%m-%d"),
+        "MOVED_BY": moved_by,
+        "REJECTED_BY_MANAGER": ((moved_by == "Manager") & (rng.random(n) < 0.3)).astype(int),
+        "MOVED_BY_MANAGER": (moved_by == "Manager").astype(int),
+        "FOLDER_TO_TITLE": _zipf_choice(rng, [f"Folder {i}" for i in range(30)], n),
+        "MOVER_EMAIL": emails,
+    })
+
+
+DATASETS = {
+    "TP_raw_data1.csv": lambda rng, days, first_id: tp_raw(rng, days),
+    "TalkpushCI_data_fetch.csv": candidate_info,
+    "TalkpushCI_SC1.csv": talkscore,
+    "Failure_Reasons.csv": lambda rng, days, first_id: failure_reasons(rng, days),
+    "Folder_Logs.csv": lambda rng, days, first_id: folder_logs(rng, days),
+}
+
+
+def generate(out, rows, days=730, seed=0):
+    os.makedirs(out, exist_ok=True)
+    first = pd.Timestamp.today().normalize() - pd.Timedelta(days=days - 1)
+    for i, (filename, make) in enumerate(DATASETS.items()):
+        rng = np.random.default_rng([seed, i])
+        path = os.path.join(out, filename)
+        chunks = max(1, -(-rows // CHUNK))
+        for c in range(chunks):
+            n = min(CHUNK, rows - c * CHUNK)
+            start, stop = days * c // chunks, days * (c + 1) // chunks
+            df = make(rng, _days(rng, start, n, first, max(1, stop - start)), c * CHUNK)
+            df.to_csv(path, mode="w" if c == 0 else "a", header=c == 0, index=False)
+        print(f"{path}: {rows:,} rows")
+
+
+def parse_rows(value):
+    return SIZES.get(value) or int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="10k, 1M, 10M or a row count")
+    parser.add_argument("--out", required=True, help="folder to write the CSV exports to")
+    parser.add_argument("--days", type=int, default=730, help="days of history, ending today")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out, args.rows, args.days, args.seed)
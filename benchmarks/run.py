@@ -0,0 +1,182 @@
+"""Time every dashboard page's data pipeline outside Streamlit.
+
+    python benchmarks/generate.py --rows 1M --out /tmp/tp_bench
+    python benchmarks/run.py --data /tmp/tp_bench --save-baseline baseline.json
+    python benchmarks/run.py --data /tmp/tp_bench --baseline baseline.json
+
+For each page and time period, the caches are cleared and build(), the
+chart builders in FIGURES and tables() are run one after another, as on a
+first visit with TP_WORKERS=1. Reports wall time, peak traced memory and the
+time spent per stage: load (store reads and refreshes), bucketing (date
+windows and groups), groupby (cubes, counters, moments, histograms and rollups), sql
+(DuckDB queries), figures, tables, and build (the rest of the page code).
+Exits with 1 when a run is slower or larger than the baseline by more than
+the tolerance.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ["load", "bucketing", "groupby", "sql", "build", "figures", "tables"]
+# Differences below these are noise, whatever the relative change
+MIN_SECONDS = 0.05
+MIN_MB = 5
+
+
+class StageTimer:
+    """Exclusive wall time per stage; nested calls are charged to the innermost stage."""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self._stack = []
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            self._push(stage)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._pop()
+        return timed
+
+    def _push(self, stage):
+        now = time.perf_counter()
+        if self._stack:
+            self.totals[self._stack[-1][0]] += now - self._stack[-1][1]
+        self._stack.append([stage, now])
+
+    def _pop(self):
+        now = time.perf_counter()
+        stage, start = self._stack.pop()
+        self.totals[stage] += now - start
+        if self._stack:
+            self._stack[-1][1] = now
+
+
+def instrument(timer):
+    import tp_data
+    import tp_hist
+    import tp_rollup
+    import tp_moments
+    import tp_sql
+    import tp_topn
+    patches = [(tp_data, ["refresh", "load", "latest", "changes_since"], "load"),
+               (tp_rollup, ["window", "date_group"], "bucketing"),
+               (tp_rollup, ["build_daily_cube", "merge_cubes", "rollup"], "groupby"),
+               (tp_topn, ["count_days"], "groupby"),
+               (tp_moments, ["build_daily_moments", "merge_moments"], "groupby"),
+               (tp_hist, ["build_daily_histogram"], "groupby"),
+               (tp_sql, ["_query"], "sql")]
+    for module, names, stage in patches:
+        for name in names:
+            setattr(module, name, timer.wrap(stage, getattr(module, name)))
+
+
+def clear_caches():
+    import tp_hist
+    import tp_loaders
+    import tp_moments
+    import tp_rollup
+    import tp_topn
+    tp_loaders.invalidate()
+    with tp_rollup._lock:
+        tp_rollup._cubes.clear()
+    with tp_topn._lock:
+        tp_topn._counters.clear()
+    with tp_moments._lock:
+        tp_moments._moments.clear()
+    with tp_hist._lock:
+        tp_hist._histograms.clear()
+
+
+def run_page(page, period, timer, memory):
+    clear_caches()
+    timer.totals = dict.fromkeys(STAGES, 0.0)
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    data = timer.wrap("build", page.build)(period)
+    timer.wrap("figures", lambda d: {name: make(d) for name, make in page.FIGURES.items()})(data)
+    timer.wrap("tables", page.tables)(data)
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+    if memory:
+        tracemalloc.stop()
+    return wall, peak, dict(timer.totals)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", required=True, help="folder with the CSV exports (e.g. from generate.py)")
+    parser.add_argument("--pages", nargs="*", help="page titles to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per view; the fastest is kept")
+    parser.add_argument("--backend", choices=["pandas", "duckdb"], default="pandas")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced-memory pass")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--save-baseline", help="write the results as a baseline to this file")
+    parser.add_argument("--baseline", help="compare against this baseline and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown/growth")
+    args = parser.parse_args(argv)
+
+    # the data layer reads its settings at import
+    os.environ["TP_DATA_DIR"] = args.data
+    os.environ["TP_BACKEND"] = args.backend
+    # every run measures a cold build, not a read of the shared cache
+    os.environ["TP_CACHE_BACKEND"] = "none"
+    sys.path.insert(0, ROOT)
+    import tp_data
+    import tp_pages
+
+    results = {"ingest": {}, "views": {}}
+    for name in tp_data.DATASETS:
+        start = time.perf_counter()
+        tp_data.refresh(name)
+        results["ingest"][name] = time.perf_counter() - start
+        print(f"ingest {name:<16}{results['ingest'][name]:>9.2f} s")
+
+    timer = StageTimer()
+    instrument(timer)
+    print(f"\n{'page':<20}{'period':<16}{'wall ms':>9}{'peak MB':>9}" + "".join(f"{s:>10}" for s in STAGES))
+    for title in args.pages or tp_pages.titles():
+        page = tp_pages.get_page(title)
+        for period in page.PERIODS:
+            runs = [run_page(page, period, timer, memory=False) for _ in range(max(1, args.repeat))]
+            wall, _, stages = min(runs, key=lambda r: r[0])
+            peak = None if args.no_memory else run_page(page, period, timer, memory=True)[1]
+            results["views"][f"{title}|{period}"] = {"wall": wall, "peak_mb": peak, "stages": stages}
+            print(f"{title:<20}{period:<16}{wall * 1000:>9.1f}{'-' if peak is None else f'{peak:.1f}':>9}"
+                  + "".join(f"{stages[s] * 1000:>10.1f}" for s in STAGES))
+
+    for path in filter(None, [args.json, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=1)
+    return compare(results, args.baseline, args.tolerance) if args.baseline else 0
+
+
+def compare(results, path, tolerance):
+    """Print the views that regressed against the baseline at `path`; 1 if any did."""
+    with open(path) as f:
+        baseline = json.load(f)["views"]
+    failures = []
+    for key, now in results["views"].items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if now["wall"] > before["wall"] * (1 + tolerance) and now["wall"] - before["wall"] > MIN_SECONDS:
+            failures.append(f"{key}: wall {before['wall'] * 1000:.1f} -> {now['wall'] * 1000:.1f} ms")
+        if now["peak_mb"] is not None and before.get("peak_mb") is not None and \
+                now["peak_mb"] > before["peak_mb"] * (1 + tolerance) and now["peak_mb"] - before["peak_mb"] > MIN_MB:
+            failures.append(f"{key}: peak {before['peak_mb']:.1f} -> {now['peak_mb']:.1f} MB")
+    print("\n" + ("\n".join(["REGRESSIONS:"] + failures) if failures else f"no regressions against {path}"))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import generate  # noqa: E402
+import tp_data  # noqa: E402
+import tp_loaders  # noqa: E402
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    generate.generate(str(tmp_path), 2000, days=120)
+    monkeypatch.setattr(tp_data, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(tp_data, "STORE_DIR", str(tmp_path / ".tp_store"))
+    monkeypatch.setattr(tp_data, "INGEST_MODE", "incremental")
+    return tmp_path
+
+
+def _source(name, columns):
+    df = tp_data.read_csv(name)
+    key = tp_data.DATASETS[name]["key"]
+    if key:
+        df = df.drop_duplicates(key, keep="last")
+    return df[columns]
+
+
+def _assert_same_rows(frame, ref):
+    cols = list(frame.columns)
+    # categories are ordered by first appearance, so sort on the values
+    frame, ref = (df[cols].astype({c: object for c in cols if isinstance(df[c].dtype, pd.CategoricalDtype)})
+                  for df in (frame, ref))
+    pd.testing.assert_frame_equal(frame.sort_values(cols).reset_index(drop=True),
+                                  ref[cols].sort_values(cols).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+def _rewrite(path, edit):
+    df = pd.read_csv(path)
+    edit(df).sample(frac=1, random_state=0).to_csv(path, index=False)
+
+
+def test_append_then_rewrite_patches_a_loaded_frame(store):
+    name = "candidate_info"
+    path = tp_data.csv_path(name)
+    registry = tp_loaders.DatasetRegistry()
+    registry.get(name)
+    df = pd.read_csv(path)
+    extra = df.tail(10).copy()
+    extra["RECORDID"] += 10 ** 6
+    extra.to_csv(path, mode="a", header=False, index=False)
+    tp_data.refresh(name)
+
+    def edit(df):
+        df.loc[df.index[-1], "CAMPAIGN_SITE"] = "Edited"
+        return df
+    _rewrite(path, edit)
+
+    frame = registry.get(name)
+    assert tp_data.changes_since(name, tp_data.refresh(name)) == []
+    _assert_same_rows(frame, _source(name, list(frame.columns)))
+
+
+def test_rewrite_drops_deleted_rows(store):
+    name = "candidate_info"
+    tp_data.refresh(name)
+    _rewrite(tp_data.csv_path(name), lambda df: df.drop(df.index[[5, 6, 7]]))
+    tp_data.refresh(name)
+    stored = pd.read_parquet(tp_data._store_path(name))
+    assert len(stored) == len(_source(name, list(stored.columns[:1])))
+
+
+def test_rewrite_of_a_keyless_export_replaces_edited_rows(store):
+    name = "tp_raw"
+    registry = tp_loaders.DatasetRegistry()
+    registry.get(name)
+
+    def edit(df):
+        df.loc[df.index[3], "TALKSCORE_OVERALL"] = df["TALKSCORE_OVERALL"].iloc[3] + 1
+        return df
+    _rewrite(tp_data.csv_path(name), edit)
+    frame = registry.get(name)
+    _assert_same_rows(frame, _source(name, list(frame.columns)))
+
+
+def test_shuffled_export_logs_no_change(store):
+    name = "tp_raw"
+    version = tp_data.refresh(name)
+    _rewrite(tp_data.csv_path(name), lambda df: df)
+    assert tp_data.refresh(name) == version
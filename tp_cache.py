@@ -0,0 +1,288 @@
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+import tp_charts
+import tp_data
+import tp_pages
+import tp_pivot
+import tp_pool
+import tp_profile
+import tp_rollup
+import tp_shared
+
+# Memory budget for cached page views; least recently used views are evicted past it
+VIEW_CACHE_MB = int(os.environ.get("TP_VIEW_CACHE_MB", 256))
+
+# Datasets each page module reads, so a view can be keyed by their versions
+_PAGE_DATASETS = {page["module"]: list(page["datasets"]) for page in tp_pages.PAGES.values()}
+# Daily cubes each page module rolls up, built concurrently before its build() runs
+_PAGE_CUBES = {page["module"]: page.get("cubes", []) for page in tp_pages.PAGES.values()}
+
+
+def _size(obj):
+    """Approximate bytes held by a built page view (frames, pivots, figures, scalars)."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, tp_pivot.Pivot):
+        return obj.memory_usage()
+    if isinstance(obj, dict):
+        return sum(_size(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_size(v) for v in obj)
+    if hasattr(obj, "to_plotly_json"):
+        return len(obj.to_json())
+    return 64
+
+
+class ViewCache:
+    """Bounded LRU of built page views, keyed by (page, period, day, data versions).
+
+    Like ``tp_loaders.DatasetRegistry`` it is process-wide, so every session
+    switching between pages and periods is served the same objects; callers
+    must not mutate them. Entries are evicted oldest-first once their
+    estimated size passes ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=VIEW_CACHE_MB << 20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (size, view)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, view):
+        size = _size(view)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[0]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (size, view)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][0]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+VIEWS = ViewCache()
+
+# (day, {dataset: version}) published by the prewarmer (see `publish`); while
+# set, views of pages whose datasets it holds are served for it instead of the
+# live store
+_published = None
+
+
+def _key(module, period, day, versions):
+    return (module, period, day, tuple(versions[name] for name in _PAGE_DATASETS.get(module, [])))
+
+
+def _shared_key(key):
+    """`key` as a shared cache key (see `tp_shared`), so other processes serve the view too."""
+    module, period, day, versions = key
+    return f"view:{module}:{period}:{day}:{':'.join(map(str, versions))}"
+
+
+def _lookup(key):
+    """(view, how it was found, whether this process holds the claim to build it) for view `key`.
+
+    A view missing here is taken from the shared cache; while another
+    process is building it this waits for that one instead of building it too.
+    """
+    cached = VIEWS.get(key)
+    if cached is not None:
+        return cached, "hit", False
+    cached, held = tp_shared.claim(_shared_key(key))
+    if cached is not None:
+        VIEWS.put(key, cached)
+        return cached, "shared", False
+    return None, "miss", held
+
+
+def _store(key, view, held):
+    VIEWS.put(key, view)
+    tp_shared.put(_shared_key(key), view)
+    if held:
+        tp_shared.release(_shared_key(key))
+
+
+def _figure(make, data):
+    fig = make(data)
+    return None if fig is None else tp_charts.compact(fig)
+
+
+def _start(module, period):
+    """Build a view's data and tables; its charts are submitted to the worker pool (name -> Future)."""
+    page = importlib.import_module(module)
+    with tp_profile.stage("build"):
+        tp_pool.gather(tp_rollup.get_cube, _PAGE_CUBES.get(module, []))
+        data = page.build(period)
+    with tp_profile.stage("figures"):
+        charts = {name: tp_pool.submit(_figure, make, data) for name, make in page.FIGURES.items()}
+    # the tables are built while the charts are
+    with tp_profile.stage("tables"):
+        tables = page.tables(data)
+    return data, charts, tables
+
+
+def _finish(module, period, charts):
+    """The built figures of `charts`, without the ones a page had no data for."""
+    figs = {name: future.result() for name, future in charts.items()}
+    figs = {name: fig for name, fig in figs.items() if fig is not None}
+    tp_charts.record_payloads(module, period, figs)
+    return figs
+
+
+def _build(module, period):
+    data, charts, tables = _start(module, period)
+    with tp_profile.stage("figures"):
+        figs = _finish(module, period, charts)
+    return data, figs, tables
+
+
+def _live_key(module, period):
+    """Cache key of a view built from the live store now.
+
+    Windows are relative to today, so the day is part of the key; the dataset
+    versions come from `tp_data.refresh`, so a new export misses the cache.
+    """
+    day = pd.Timestamp.today().date()
+    versions = {name: tp_data.refresh(name) for name in _PAGE_DATASETS.get(module, [])}
+    return _key(module, period, day, versions)
+
+
+def _current(module, period):
+    """(key, view or None, how it was found, claim held) of a view as sessions are served it now.
+
+    The published view is served while there is one. A view missing from the
+    published set (evicted, or its build failed) is not rebuilt under the
+    published key, since a build reads the live store and today's date: it
+    is looked up, and built, under the live key instead.
+    """
+    published = _published
+    if published is not None and all(name in published[1] for name in _PAGE_DATASETS.get(module, [])):
+        key = _key(module, period, *published)
+        cached = VIEWS.get(key)
+        if cached is None:
+            cached = tp_shared.get(_shared_key(key))
+            if cached is not None:
+                VIEWS.put(key, cached)
+                return key, cached, "shared", False
+        else:
+            return key, cached, "hit", False
+    key = _live_key(module, period)
+    return (key, *_lookup(key))
+
+
+def view(module, period):
+    """(data, figures, tables) of page `module` for `period`, built once per data version."""
+    key, cached, found, held = _current(module, period)
+    tp_profile.annotate(period=period, view_cache=found)
+    if cached is not None:
+        return cached
+    try:
+        result = _build(module, period)
+    except BaseException:
+        if held:
+            tp_shared.release(_shared_key(key))
+        raise
+    _store(key, result, held)
+    return result
+
+
+def view_async(module, period):
+    """Like `view`, but the figures are Futures (name -> Future, in page order).
+
+    On a miss the charts are built on the worker pool while the page draws
+    what it already has, and `tp_charts.stream` puts each one into its
+    placeholder as it finishes; the view is cached once the last one is done.
+    A chart the page had no data for resolves to None.
+    """
+    key, cached, found, held = _current(module, period)
+    tp_profile.annotate(period=period, view_cache=found)
+    if cached is not None:
+        data, figs, tables = cached
+        return data, {name: _resolved(figs.get(name)) for name in importlib.import_module(module).FIGURES}, tables
+    try:
+        data, charts, tables = _start(module, period)
+    except BaseException:
+        if held:
+            tp_shared.release(_shared_key(key))
+        raise
+
+    def cache():
+        if all(future.exception() is None for future in charts.values()):
+            _store(key, (data, _finish(module, period, charts), tables), held)
+        elif held:
+            tp_shared.release(_shared_key(key))
+
+    tp_pool.when_all(charts.values(), cache)
+    return data, charts, tables
+
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def warm(module, period, day, versions):
+    """Build a view into the cache for `day` and dataset `versions`, unless it is there (or shared) already."""
+    key = _key(module, period, day, versions)
+    if key in VIEWS:
+        return
+    cached, _, held = _lookup(key)
+    if cached is not None:
+        return
+    try:
+        view = _build(module, period)
+    except BaseException:
+        if held:
+            tp_shared.release(_shared_key(key))
+        raise
+    _store(key, view, held)
+
+
+def publish(day, versions):
+    """Serve views for `day` and dataset `versions` from now on; None goes back to the live store.
+
+    One assignment, so readers switch from one complete set of views to the
+    next without ever seeing a mix. A page reading a dataset missing from
+    `versions` (its export failed to ingest) is served from the live store.
+    """
+    global _published
+    _published = None if versions is None else (day, dict(versions))
+
+
+def stats():
+    return VIEWS.stats()
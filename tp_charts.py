@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Most series a categorical chart shows; the smaller ones are summed into OTHER
+MAX_CATEGORIES = int(os.environ.get("TP_MAX_CATEGORIES", 10))
+OTHER = "Other"
+# Figures whose JSON is larger than this are logged when their view is built
+PAYLOAD_WARN_KB = int(os.environ.get("TP_PAYLOAD_WARN_KB", 512))
+
+_payloads = {}  # (page, period, chart) -> {"traces", "points", "bytes"}
+_lock = threading.Lock()
+
+
+def fold_tail(df, dim, values, by="DATE_GROUP", max_categories=MAX_CATEGORIES):
+    """Keep the largest `dim` values (ranked by total of the first of `values`)
+    and sum the others into one OTHER row per `by` group.
+
+    `df` should hold only the `by`, `dim` and `values` columns.
+    """
+    values = [values] if isinstance(values, str) else list(values)
+    totals = df.groupby(dim, observed=True)[values[0]].sum()
+    if len(totals) <= max_categories:
+        return df
+    tail = ~df[dim].isin(totals.nlargest(max_categories - 1).index)
+    other = df[tail].groupby(by, observed=True, as_index=False)[values].sum().assign(**{dim: OTHER})
+    out = pd.concat([df[~tail].astype({dim: object}), other.reindex(columns=df.columns)], ignore_index=True)
+    return out.sort_values(by, kind="stable", ignore_index=True)
+
+
+def compact(fig):
+    """Drop per-point text that only repeats a trace's y values, in place.
+
+    The labels are drawn from y through the text/hover templates instead,
+    so the browser receives one array rather than two.
+    """
+    for trace in fig.data:
+        text, y = getattr(trace, "text", None), getattr(trace, "y", None)
+        if text is None or y is None or isinstance(text, str) or len(text) != len(y):
+            continue
+        y = np.asarray(y)
+        if not np.array_equal(np.asarray(text, dtype=object), y.astype(object)):
+            continue
+        template = trace.texttemplate
+        if not template:
+            if not np.issubdtype(y.dtype, np.integer):
+                continue
+            template = "%{y:d}"  # how an integer text label is shown
+        trace.update(text=None, texttemplate=template.replace("%{text", "%{y"),
+                     hovertemplate=(trace.hovertemplate or "").replace("%{text", "%{y") or None)
+    return fig
+
+
+def record_payloads(page, period, figs):
+    """Measure the JSON each figure sends to the browser and keep it for `payload_report`."""
+    for name, fig in figs.items():
+        size = len(fig.to_json())
+        points = sum(len(t.y) if getattr(t, "y", None) is not None else 0 for t in fig.data)
+        with _lock:
+            _payloads[(page, period, name)] = {"traces": len(fig.data), "points": points, "bytes": size}
+        if size > PAYLOAD_WARN_KB << 10:
+            log.warning("%s %s %s: %d KB chart payload (%d traces)", page, period, name, size >> 10, len(fig.data))
+
+
+def payload_report():
+    """Payload size of every chart built so far, largest first."""
+    with _lock:
+        rows = [{"page": page, "period": period, "chart": name, **stats}
+                for (page, period, name), stats in _payloads.items()]
+    return pd.DataFrame(rows, columns=["page", "period", "chart", "traces", "points", "bytes"]).sort_values(
+        "bytes", ascending=False, ignore_index=True)
+
+
+def stream(charts, slots, missing=None, **kwargs):
+    """Draw each chart (name -> Future, see `tp_cache.view_async`) into its slot as soon as it is built.
+
+    `slots` maps chart names to ``st.empty()`` placeholders created in page
+    order, so the layout does not depend on which chart finishes first. A chart
+    that resolved to None gets its `missing` text instead, if any.
+    """
+    names = {future: name for name, future in charts.items()}
+    for future in as_completed(names):
+        name = names[future]
+        fig = future.result()
+        if fig is not None:
+            slots[name].plotly_chart(fig, **kwargs)
+        elif missing and name in missing:
+            slots[name].write(missing[name])
@@ -0,0 +1,579 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import tp_profile
+
+try:
+    import pyarrow  # noqa: F401  (parquet engine)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import fcntl  # POSIX file locks, so processes sharing a store ingest one at a time
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Folder holding the raw Talkpush exports and the columnar copies built from them
+DATA_DIR = os.environ.get("TP_DATA_DIR", ".")
+STORE_DIR = os.environ.get("TP_STORE_DIR", os.path.join(DATA_DIR, ".tp_store"))
+
+# "full": every export is a complete re-export, rebuilt whenever its content changes.
+# "incremental": only rows past the persisted watermark are ingested and appended.
+INGEST_MODE = os.environ.get("TP_INGEST_MODE", "full")
+
+# Bytes before the ingest offset used to recognise an append-only export
+_FINGERPRINT_BYTES = 4096
+# Partition for rows without a date; sorts before every real month
+_NO_MONTH = "0000-00"
+# Changes kept in the log so loaders and rollups can catch up without a full reload
+_MAX_CHANGES = 50
+# Bumped whenever the stored columns or file layout change; stores of another format are rebuilt
+_STORE_FORMAT = 4
+
+
+def _canonical_email(emails):
+    """Emails with any "+tag" dropped from the local part, as a categorical.
+
+    The regex runs over the distinct values only and the row codes are
+    remapped onto the cleaned categories; missing emails stay missing.
+    """
+    emails = emails.astype("category")
+    cleaned = emails.cat.categories.astype(str).str.replace(r"\+.*?@", "@", regex=True)
+    categories = pd.Index(cleaned).unique().sort_values()
+    remap = np.append(categories.get_indexer(cleaned), -1)  # code -1 (missing) maps to itself
+    return pd.Categorical.from_codes(remap[emails.cat.codes.to_numpy()], categories=categories)
+
+
+# Talkscore components as exported (0-10 with one or two decimals)
+_SCORES = ["TALKSCORE_OVERALL", "TALKSCORE_VOCAB", "TALKSCORE_FLUENCY", "TALKSCORE_GRAMMAR",
+           "TALKSCORE_PRONUNCIATION", "TALKSCORE_COMPREHENSION"]
+# Accepted spellings of the t/f flags; a missing flag reads as False
+_TRUE = {"t", "true", "y", "yes", "1"}
+_FALSE = {"f", "false", "n", "no", "0"}
+
+
+def _schema(category=(), float32=(), int8=(), flags=()):
+    return {**dict.fromkeys(category, "category"), **dict.fromkeys(float32, "float32"),
+            **dict.fromkeys(int8, "int8"), **dict.fromkeys(flags, "bool")}
+
+
+# One entry per export: source CSV, its date column, an optional record key,
+# the schema applied while it is parsed ("category" for low-cardinality
+# strings, "float32" for scores, "int8" for 0/1 counters, "bool" for t/f
+# flags; unlisted columns keep the types pandas infers) and the columns
+# derived from another one at ingest (name -> (source column, function))
+DATASETS = {
+    "tp_raw": {
+        "csv": "TP_raw_data1.csv",
+        "date": "DATE_DAY",
+        "key": None,
+        "schema": _schema(category=["CAMP_SITE", "NEW_SOURCE", "TALKSCORE_CEFR"], float32=_SCORES,
+                          int8=["TEST_COMPLETED", "FOR_TS_REVIEW"]),
+    },
+    "candidate_info": {
+        "csv": "TalkpushCI_data_fetch.csv",
+        "date": "INVITATIONDT",
+        "key": "RECORDID",
+        "schema": _schema(category=["CAMPAIGNTITLE", "SOURCE", "ASSIGNEDMANAGER", "FOLDER", "COMPLETIONMETHOD",
+                                    "CAMPAIGN_TYPE", "CAMPAIGN_SITE"], flags=["REPEATAPPLICATION"]),
+    },
+    "talkscore": {
+        "csv": "TalkpushCI_SC1.csv",
+        "date": "INVITATIONDT_UTC",
+        "key": "RECORDID",
+        "schema": _schema(category=["REJECTED_REASON"], float32=_SCORES),
+    },
+    "failure_reasons": {
+        "csv": "Failure_Reasons.csv",
+        "date": "DATE_DAY",
+        "key": None,
+        "schema": _schema(category=["FAILED_REASON", "CEFR"], float32=["VOC", "FLU", "GRAM", "COMP", "PRON", "OVERALL"]),
+    },
+    "folder_logs": {
+        "csv": "Folder_Logs.csv",
+        "date": "DATE_DAY",
+        "key": None,
+        "schema": _schema(category=["MOVED_BY", "FOLDER_TO_TITLE", "MOVER_EMAIL"],
+                          int8=["REJECTED_BY_MANAGER", "MOVED_BY_MANAGER"]),
+        "derived": {"CLEANED_MOVER_EMAIL": ("MOVER_EMAIL", _canonical_email)},
+    },
+}
+
+_refresh_locks = {name: threading.Lock() for name in DATASETS}
+
+
+@contextmanager
+def _store_lock(name):
+    """Hold the ingest lock of a dataset's store against other processes using the same store folder."""
+    if not HAS_FCNTL:
+        yield
+        return
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(os.path.join(STORE_DIR, f"{name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+
+def csv_path(name):
+    return os.path.join(DATA_DIR, DATASETS[name]["csv"])
+
+
+def _store_path(name):
+    return os.path.join(STORE_DIR, name)
+
+
+def _log_path(name):
+    """Folder keeping the part files the change log still names after they left the store."""
+    return os.path.join(STORE_DIR, f"{name}.log")
+
+
+def parquet_glob(name):
+    """Glob matching every part file of a dataset's store (for readers such as DuckDB)."""
+    return os.path.join(_store_path(name), "**", "*.parquet")
+
+
+def _meta_path(name):
+    return os.path.join(STORE_DIR, f"{name}.meta.json")
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fingerprint(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - _FINGERPRINT_BYTES))
+        return hashlib.sha1(f.read(min(offset, _FINGERPRINT_BYTES))).hexdigest()
+
+
+def _read_meta(name):
+    try:
+        with open(_meta_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(name, meta):
+    tmp = _meta_path(name) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(name))
+
+
+def _to_int8(values, where):
+    """Integer counters as int8; missing, fractional or out-of-range values are rejected."""
+    if values.dtype.kind not in "iub":
+        numeric = pd.to_numeric(values, errors="coerce")
+        bad = numeric.isna() | (numeric % 1 != 0)
+        if bad.any():
+            raise ValueError(f"{where}: {bad.sum()} values are missing or not integers")
+        values = numeric
+    if len(values) and (values.min() < -128 or values.max() > 127):
+        raise ValueError(f"{where}: values outside the int8 range ({values.min()}..{values.max()})")
+    return values.astype("int8")
+
+
+def _to_bool(values, where):
+    """t/f flags (parsed as a categorical) as bool; a missing flag is False."""
+    labels = values.cat.categories.astype(str).str.strip().str.lower()
+    unknown = labels[~labels.isin(_TRUE | _FALSE)]
+    if len(unknown):
+        raise ValueError(f"{where}: expected t/f flags, got {list(unknown[:5])}")
+    truth = np.append(labels.isin(_TRUE), False)  # code -1 (missing) is the last entry
+    return pd.Series(truth[values.cat.codes.to_numpy()], index=values.index, name=values.name)
+
+
+def read_csv(name, columns=None, source=None):
+    """Parse a raw export (or `source`, a path/buffer in the same layout) with
+    its date column and schema already applied and derived columns added.
+
+    Raises ValueError naming the dataset and column when a value does not fit
+    the schema, rather than silently keeping a wider type.
+    """
+    spec = DATASETS[name]
+    source = csv_path(name) if source is None else source
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    derived = {col: rule for col, rule in spec.get("derived", {}).items() if columns is None or col in columns}
+    if columns is not None:
+        columns = list(columns) + [src for src, _ in derived.values()]
+    usecols = list(header) if columns is None else [c for c in header if c in columns]
+    schema = {c: t for c, t in spec["schema"].items() if c in usecols}
+    # categoricals and floats are typed by the parser; counters and flags are checked first
+    dtype = {c: "category" if t == "bool" else t for c, t in schema.items() if t != "int8"}
+    with tp_profile.stage("read_csv"):
+        try:
+            df = pd.read_csv(source, usecols=usecols, dtype=dtype)
+        except ValueError as exc:
+            raise ValueError(f"{name}: export does not match its schema ({exc})") from exc
+    for col, kind in schema.items():
+        if kind == "int8":
+            df[col] = _to_int8(df[col], f"{name}.{col}")
+        elif kind == "bool":
+            df[col] = _to_bool(df[col], f"{name}.{col}")
+    if spec["date"] in df.columns:
+        with tp_profile.stage("to_datetime"):
+            df[spec["date"]] = pd.to_datetime(df[spec["date"]])
+    for col, (src, fn) in derived.items():
+        if src in df.columns:
+            df[col] = fn(df[src])
+    return df
+
+
+def widen(values):
+    """float64 (or int64) copy of a narrow numeric column, for accumulating sums.
+
+    float32 keeps about 7 significant digits, so its values are rounded back
+    to the decimals that survive at the column's magnitude; a score stored as
+    7.8 sums as 7.8, not 7.80000019.
+    """
+    if values.dtype.kind != "f":
+        return values.astype("int64")
+    wide = values.astype("float64")
+    top = wide.abs().max()
+    if values.dtype != np.float32 or pd.isna(top):
+        return wide
+    return wide.round(max(6 - int(np.ceil(np.log10(top + 1))), 0))
+
+
+def memory_report(names=None):
+    """In-memory size of each export parsed with pandas' default dtypes vs. with its schema."""
+    rows = []
+    for name in names or DATASETS:
+        date = DATASETS[name]["date"]
+        default = pd.read_csv(csv_path(name))
+        if date in default.columns:
+            default[date] = pd.to_datetime(default[date])
+        typed = read_csv(name)[list(default.columns)]
+        before = default.memory_usage(deep=True).sum() / 2**20
+        after = typed.memory_usage(deep=True).sum() / 2**20
+        rows.append({"dataset": name, "rows": len(typed), "default_mb": round(before, 2),
+                     "schema_mb": round(after, 2), "ratio": round(before / after, 1) if after else None})
+    return pd.DataFrame(rows)
+
+
+def concat_frames(frames):
+    """pd.concat that keeps categorical columns categorical (categories are unioned)."""
+    frames = [f for f in frames if len(f)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            cats = pd.api.types.union_categoricals([f[col].astype("category") for f in frames]).categories
+            frames = [f.assign(**{col: f[col].astype(pd.CategoricalDtype(cats))}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _write_file(name, rel, df):
+    path = os.path.join(_store_path(name), rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + ".tmp", index=False, compression="zstd")
+    os.replace(path + ".tmp", path)
+    date = DATASETS[name]["date"]
+    return {"file": rel, "min": str(df[date].min()), "max": str(df[date].max())}
+
+
+def _write_parts(name, df, seq):
+    """Write `df` as one part per month (hive layout ``month=YYYY-MM/part-<seq>.parquet``)."""
+    months = df[DATASETS[name]["date"]].dt.strftime("%Y-%m").fillna(_NO_MONTH)
+    return [_write_file(name, f"month={month}/part-{seq:05d}.parquet", rows.reset_index(drop=True))
+            for month, rows in df.groupby(months.values, sort=True)]
+
+
+def _scan_state(path):
+    """Ingest offset (end of the last complete line), header and tail fingerprint."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - _FINGERPRINT_BYTES))
+        tail = f.read()
+    offset = size - (len(tail) - tail.rfind(b"\n") - 1) if b"\n" in tail else size
+    return {"offset": offset, "header": header.decode("utf-8"), "tail_fp": _fingerprint(path, offset)}
+
+
+def _full_rebuild(name, st_):
+    shutil.rmtree(_store_path(name), ignore_errors=True)
+    shutil.rmtree(_log_path(name), ignore_errors=True)
+    df = read_csv(name)
+    parts = _write_parts(name, df, 0)
+    digest = _file_hash(csv_path(name))
+    date = DATASETS[name]["date"]
+    meta = {"format": _STORE_FORMAT, "mtime_ns": st_.st_mtime_ns, "size": st_.st_size, "sha1": digest,
+            "version": digest,
+            "parts": parts, "seq": 1, "changes": [],
+            "watermark": str(df[date].max().normalize()) if df[date].notna().any() else None}
+    meta.update(_scan_state(csv_path(name)))
+    return meta
+
+
+def _month_hashes(df, date_col, cols):
+    """Occurrences of each row (by content hash) per month, undated rows under NaT."""
+    return pd.DataFrame({"month": df[date_col].dt.to_period("M"),
+                         "row": pd.util.hash_pandas_object(df[cols], index=False).to_numpy()}
+                        ).groupby(["month", "row"], dropna=False).size()
+
+
+def _rewrite_cutoff(name, df):
+    """First day to re-ingest a rewritten export from, or None when the store already holds it.
+
+    The store and the export are compared month by month as multisets of
+    row hashes, so edited, added and deleted rows all move the cutoff back
+    to the start of the earliest month that differs. Undated rows are
+    re-ingested with every cutoff.
+    """
+    date_col = DATASETS[name]["date"]
+    stored = pd.read_parquet(_store_path(name))
+    cols = [c for c in df.columns if c in stored.columns]
+    old, new = _month_hashes(stored, date_col, cols), _month_hashes(df, date_col, cols)
+    both = old.index.union(new.index)
+    differ = old.reindex(both, fill_value=0) != new.reindex(both, fill_value=0)
+    months = both[differ.to_numpy()].get_level_values("month")
+    dated = months[months.notna()]
+    if len(dated):
+        return dated.min().to_timestamp()
+    if len(months):
+        # only undated rows changed: they are re-ingested from the last day on
+        return df[date_col].max().normalize() if df[date_col].notna().any() else None
+    return None
+
+
+def _retire(name, rel):
+    """Move a part out of the store, into the log folder, where change log entries can still read it."""
+    path = os.path.join(_log_path(name), rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(os.path.join(_store_path(name), rel), path)
+
+
+def _part_path(name, rel):
+    """Path of a part a change log entry names, in the store or the log folder (None when gone)."""
+    for folder in (_store_path(name), _log_path(name)):
+        path = os.path.join(folder, rel)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _prune_log(name, meta):
+    """Delete retired parts no change log entry names any more."""
+    named = {rel for change in meta["changes"] for rel in change["parts"]}
+    root = _log_path(name)
+    for folder, _, files in os.walk(root, topdown=False):
+        for file in files:
+            if os.path.relpath(os.path.join(folder, file), root) not in named:
+                os.remove(os.path.join(folder, file))
+        if not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def _ingest_increment(name, meta, st_):
+    """Append rows past the watermark to the store and log the change; returns the updated meta.
+
+    Part files are never rewritten in place: rows kept from a part the
+    cutoff touches go to a new part, and the old one moves to the log folder
+    while a change log entry names it.
+    """
+    spec = DATASETS[name]
+    src = csv_path(name)
+    cutoff = None
+    new = False
+    if st_.st_size >= meta["offset"] and _fingerprint(src, meta["offset"]) == meta["tail_fp"]:
+        # append-only export: parse just the bytes after the previous offset
+        with open(src, "rb") as f:
+            f.seek(meta["offset"])
+            tail = f.read()
+        tail = tail[:tail.rfind(b"\n") + 1]
+        if not tail.strip():
+            new = None
+        else:
+            new = read_csv(name, source=io.BytesIO(meta["header"].encode("utf-8") + tail))
+            key = spec["key"]
+            if key and key in new.columns and \
+                    new[key].isin(pd.read_parquet(_store_path(name), columns=[key])[key]).any():
+                # an appended row updates a stored record, which has to be replaced
+                new = False
+    if new is False:
+        # rewritten export: everything from the first month that differs from
+        # the store on (and undated rows) is re-ingested; a record appearing
+        # twice keeps its last row
+        df = read_csv(name)
+        if spec["key"] and spec["key"] in df.columns:
+            df = df.drop_duplicates(spec["key"], keep="last")
+        cutoff = _rewrite_cutoff(name, df)
+        dates = df[spec["date"]]
+        new = df[(dates >= cutoff) | dates.isna()] if cutoff is not None else None
+        if cutoff is not None:
+            parts, kept = [], []
+            for part in meta["parts"]:
+                if pd.Timestamp(part["max"]) < cutoff:
+                    parts.append(part)
+                    continue
+                rows = pd.read_parquet(os.path.join(_store_path(name), part["file"]))
+                kept.append(rows[rows[spec["date"]] < cutoff])
+                _retire(name, part["file"])
+            kept = [rows for rows in kept if len(rows)]
+            if kept:
+                parts.extend(_write_parts(name, concat_frames(kept), meta["seq"]))
+                meta["seq"] += 1
+            meta["parts"] = parts
+            cutoff = str(cutoff)
+
+    written = []
+    if new is not None and len(new):
+        if spec["key"] and spec["key"] in new.columns:
+            new = new.drop_duplicates(spec["key"], keep="last")
+        written = _write_parts(name, new, meta["seq"])
+        meta["seq"] += 1
+        meta["parts"].extend(written)
+        latest = new[spec["date"]].max()
+        if pd.notna(latest) and (meta["watermark"] is None or latest.normalize() > pd.Timestamp(meta["watermark"])):
+            meta["watermark"] = str(latest.normalize())
+    if written or cutoff:
+        files = [p["file"] for p in written]
+        prev = meta["version"]
+        meta["version"] = hashlib.sha1(f"{prev}:{files}:{cutoff}".encode()).hexdigest()
+        change = {"prev": prev, "version": meta["version"], "cutoff": cutoff, "parts": files}
+        meta["changes"] = (meta["changes"] + [change])[-_MAX_CHANGES:]
+    _prune_log(name, meta)
+    meta.update({"mtime_ns": st_.st_mtime_ns, "size": st_.st_size, "sha1": None})
+    meta.update(_scan_state(src))
+    return meta
+
+
+def _valid_meta(name):
+    """Store metadata of a dataset, or None when there is no usable store."""
+    meta = _read_meta(name)
+    if meta and (meta.get("format") != _STORE_FORMAT or not os.path.isdir(_store_path(name))):
+        return None
+    return meta
+
+
+@tp_profile.timed("refresh")
+def refresh(name):
+    """Bring the columnar store of a dataset up to date with its source CSV.
+
+    In full mode the cheap mtime/size check runs first; when only the mtime
+    moved the content hash decides, so a touched-but-identical export is not
+    rebuilt. In incremental mode new rows are appended as a new part and
+    logged in the change log (see `changes_since`). Returns the store version.
+    """
+    src = csv_path(name)
+    st_ = os.stat(src)
+    if not HAS_PYARROW:
+        return f"{st_.st_mtime_ns}-{st_.st_size}"
+    meta = _valid_meta(name)
+    if meta and meta["mtime_ns"] == st_.st_mtime_ns and meta["size"] == st_.st_size:
+        return meta["version"]
+
+    # one ingest per dataset at a time, across threads and worker processes;
+    # the ones that waited reuse its result
+    with _refresh_locks[name], _store_lock(name):
+        meta = _valid_meta(name)
+        if meta and meta["mtime_ns"] == st_.st_mtime_ns and meta["size"] == st_.st_size:
+            return meta["version"]
+        if meta and INGEST_MODE == "incremental":
+            meta = _ingest_increment(name, meta, st_)
+        elif meta and meta["sha1"] and meta["sha1"] == _file_hash(src):
+            meta.update({"mtime_ns": st_.st_mtime_ns, "size": st_.st_size})
+        else:
+            meta = _full_rebuild(name, st_)
+        _write_meta(name, meta)
+    return meta["version"]
+
+
+def changes_since(name, version):
+    """Changes applied to the store after `version`, oldest first.
+
+    Each change is ``(cutoff, rows)``: drop rows dated on/after `cutoff` (if
+    not None), then add `rows`. Returns None when `version` is not in the log
+    and the caller has to reload the dataset from scratch, which is also the
+    answer when a part the log names has been pruned in the meantime.
+    """
+    meta = _read_meta(name)
+    if meta is None:
+        return None
+    if version == meta["version"]:
+        return []
+    prevs = [c["prev"] for c in meta["changes"]]
+    if version not in prevs:
+        return None
+    out = []
+    for change in meta["changes"][prevs.index(version):]:
+        rows = None
+        if change["parts"]:
+            paths = [_part_path(name, f) for f in change["parts"]]
+            if None in paths:
+                return None
+            try:
+                rows = concat_frames([pd.read_parquet(path) for path in paths])
+            except OSError:
+                return None
+        out.append((pd.Timestamp(change["cutoff"]) if change["cutoff"] else None, rows))
+    return out
+
+
+def apply_changes(frame, name, changes):
+    """Bring a loaded frame up to date with the changes from `changes_since`."""
+    date = DATASETS[name]["date"]
+    for cutoff, rows in changes:
+        if cutoff is not None:
+            frame = frame[frame[date] < cutoff]
+        if rows is not None:
+            frame = concat_frames([frame, rows.reindex(columns=frame.columns)])
+    return frame
+
+
+def latest(name):
+    """Most recent timestamp in a dataset, answered from the store metadata."""
+    if not HAS_PYARROW:
+        return read_csv(name, [DATASETS[name]["date"]])[DATASETS[name]["date"]].max()
+    refresh(name)
+    return max((pd.Timestamp(p["max"]) for p in _read_meta(name)["parts"]), default=pd.NaT)
+
+
+@tp_profile.timed("load")
+def load(name, columns=None, since=None):
+    """Load a dataset, reading only `columns` (missing ones are skipped).
+
+    With `since`, only rows dated on/after it are returned; the filter is
+    pushed down to the reader, so month partitions before it are never
+    opened. Served from the typed parquet store when pyarrow is available,
+    otherwise straight from the CSV.
+    """
+    date = DATASETS[name]["date"]
+    if not HAS_PYARROW:
+        df = read_csv(name, columns)
+        return df if since is None else df[df[date] >= since].reset_index(drop=True)
+    refresh(name)
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(_store_path(name), format="parquet",
+                         partitioning=ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive"))
+    names = [f for f in dataset.schema.names if f != "month"]
+    columns = names if columns is None else [c for c in columns if c in names]
+    predicate = None
+    if since is not None:
+        since = pd.Timestamp(since)
+        predicate = (ds.field("month") >= since.strftime("%Y-%m")) & \
+            (ds.field(date) >= pa.scalar(since.to_pydatetime(), dataset.schema.field(date).type))
+    return dataset.to_table(columns=columns, filter=predicate).to_pandas()
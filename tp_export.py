@@ -0,0 +1,200 @@
+"""Render the dashboard pages to static reports, without Streamlit.
+
+    python tp_export.py --out reports
+    python tp_export.py --out reports --periods "Last 12 Weeks" --pages "Failure Reasons" "CEFR Dive"
+    python tp_export.py --data /path/to/exports --out reports --png
+
+Each page is built for every selected period it offers, exactly as the
+dashboard builds it: through the page view cache, on top of the daily cubes,
+counters and histograms, which are built once and shared by every page and
+period; only the exports the selected pages read are ingested. The (page,
+period) views are built concurrently on the worker pool (TP_WORKERS). For
+each period, <out>/<period>.html holds every chart and table, and
+<out>/<period>.xlsx holds one sheet per table. With --png, each chart is
+also written to <out>/<period>/ (this needs the kaleido package).
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+
+try:
+    import kaleido  # noqa: F401  (plotly's static image engine, for --png)
+    HAS_KALEIDO = True
+except ImportError:
+    HAS_KALEIDO = False
+
+# Characters Excel does not allow in sheet names, and its length limit
+_SHEET_BAD = re.compile(r"[\[\]:*?/\\]")
+_SHEET_MAX = 31
+
+_STYLE = """
+body { font-family: sans-serif; margin: 2em; }
+h1 { color: #2F76B9; }
+table { border-collapse: collapse; font-size: 12px; margin-bottom: 2em; }
+th, td { border: 1px solid #ddd; padding: 2px 6px; text-align: right; }
+th { background: #f5f5f5; }
+"""
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def sheet_name(text, used):
+    """`text` as a valid Excel sheet name not in `used` (which it is added to)."""
+    base = _SHEET_BAD.sub(" ", text)[:_SHEET_MAX].strip() or "Sheet"
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base[:_SHEET_MAX - len(str(n)) - 1]}~{n}"
+    used.add(name.lower())
+    return name
+
+
+def table_frame(table, formatted=True):
+    """The full frame of a page table (a DataFrame or a tp_pivot.Pivot)."""
+    return table.frame(formatted=formatted) if hasattr(table, "frame") else table
+
+
+def build_views(jobs):
+    """{(title, period): (figures, tables)} of every (title, period) in `jobs`, built concurrently."""
+    import tp_cache
+    import tp_pages
+    import tp_pool
+
+    def build(job):
+        title, period = job
+        _, figs, tables = tp_cache.view(tp_pages.PAGES[title]["module"], period)
+        return figs, tables
+
+    return dict(zip(jobs, tp_pool.gather(build, jobs)))
+
+
+def write_html(path, period, pages):
+    """One page per section: its charts (plotly.js is inlined once), then its tables."""
+    import tp_pages
+
+    parts = [f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(period)}</title>"
+             f"<style>{_STYLE}</style></head><body><h1>Talkpush dashboard: {html.escape(period)}</h1>",
+             "<ul>" + "".join(f"<li><a href='#{slug(title)}'>{html.escape(title)}</a></li>" for title in pages)
+             + "</ul>"]
+    plotlyjs = True
+    for title, (figs, tables) in pages.items():
+        parts.append(f"<h2 id='{slug(title)}'>{html.escape(title)}</h2>")
+        page = tp_pages.get_page(title)
+        for name in page.FIGURES:
+            if name in figs:
+                parts.append(figs[name].to_html(full_html=False, include_plotlyjs=plotlyjs))
+                plotlyjs = False
+            elif name in getattr(page, "MISSING", {}):
+                parts.append(f"<p><em>{html.escape(page.MISSING[name])}</em></p>")
+        for table_title, table in tables.items():
+            parts.append(f"<h3>{html.escape(table_title)}</h3>")
+            parts.append(table_frame(table).to_html(na_rep="", float_format=lambda v: f"{v:,.2f}"))
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def excel_frame(table):
+    """A table's frame for Excel: unformatted, float32 columns widened to the decimals they were exported with."""
+    import numpy as np
+    import tp_data
+
+    frame = table_frame(table, formatted=False)
+    narrow = [i for i, dtype in enumerate(frame.dtypes) if dtype == np.float32]
+    if narrow:
+        frame = frame.copy()
+        for i in narrow:
+            frame.isetitem(i, tp_data.widen(frame.iloc[:, i]))
+    return frame
+
+
+def write_excel(path, pages):
+    """One sheet per table (numbers unformatted), named after its page and title; False when no page has tables."""
+    import pandas as pd
+
+    sheets = [(f"{title} - {table_title}", excel_frame(table))
+              for title, (_, tables) in pages.items() for table_title, table in tables.items()]
+    if not sheets:
+        return False
+    used = set()
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for name, frame in sheets:
+            # a plain numbered index carries nothing, but MultiIndex columns can only be written with one
+            index = not isinstance(frame.index, pd.RangeIndex) or isinstance(frame.columns, pd.MultiIndex)
+            frame.to_excel(writer, sheet_name=sheet_name(name, used), index=index)
+    return True
+
+
+def write_png(folder, pages):
+    os.makedirs(folder, exist_ok=True)
+    for title, (figs, _) in pages.items():
+        for name, fig in figs.items():
+            fig.write_image(os.path.join(folder, f"{slug(title)}-{name}.png"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="folder the reports are written to")
+    parser.add_argument("--data", help="folder with the CSV exports (default: TP_DATA_DIR)")
+    parser.add_argument("--pages", nargs="*", help="page titles to export (default: all)")
+    parser.add_argument("--periods", nargs="*", help="time periods to export (default: every period a page offers)")
+    parser.add_argument("--png", action="store_true", help="also write every chart as a PNG image")
+    args = parser.parse_args(argv)
+    if args.png and not HAS_KALEIDO:
+        parser.error("--png needs the kaleido package")
+
+    # the data layer reads its settings at import
+    if args.data:
+        os.environ["TP_DATA_DIR"] = args.data
+    import pandas as pd
+    import tp_cache
+    import tp_pages
+    import tp_prewarm
+
+    titles = args.pages or tp_pages.titles()
+    unknown = [title for title in titles if title not in tp_pages.titles()]
+    if unknown:
+        parser.error(f"unknown pages: {', '.join(unknown)}")
+    offered = {title: tp_pages.get_page(title).PERIODS for title in titles}
+    periods = args.periods or list(dict.fromkeys(p for ps in offered.values() for p in ps))
+    jobs = [(title, period) for period in periods for title in titles if period in offered[title]]
+    if not jobs:
+        parser.error("no page offers the selected periods")
+
+    start = time.perf_counter()
+    # every view of the run is built against the same dataset versions
+    # only the exports the selected pages read
+    versions, errors = tp_prewarm.ingest_all(dict.fromkeys(name for title in titles
+                                                           for name in tp_pages.PAGES[title]["datasets"]))
+    if errors:
+        parser.error("; ".join(f"{name}: {exc}" for name, exc in errors.items()))
+    tp_cache.publish(pd.Timestamp.today().date(), versions)
+    print(f"ingest {time.perf_counter() - start:>9.2f} s")
+    start = time.perf_counter()
+    views = build_views(jobs)
+    print(f"build  {time.perf_counter() - start:>9.2f} s  ({len(jobs)} views)")
+
+    os.makedirs(args.out, exist_ok=True)
+    for period in periods:
+        pages = {title: views[title, period] for title in titles if (title, period) in views}
+        if not pages:
+            print(f"skip {period}: no selected page offers it")
+            continue
+        written = [os.path.join(args.out, f"{slug(period)}.html")]
+        write_html(written[0], period, pages)
+        if write_excel(os.path.join(args.out, f"{slug(period)}.xlsx"), pages):
+            written.append(os.path.join(args.out, f"{slug(period)}.xlsx"))
+        if args.png:
+            write_png(os.path.join(args.out, slug(period)), pages)
+            written.append(os.path.join(args.out, slug(period), ""))
+        print(f"{period:<16}" + "  ".join(written))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
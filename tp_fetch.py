@@ -0,0 +1,387 @@
+"""Fetch the Talkpush exports over HTTP in the background and install them atomically.
+
+    TP_FETCH_URL="http://warehouse/exports/{csv}" streamlit run TP_analysis_all.py
+    python tp_fetch.py stub --folder /tmp/tp_bench --port 8765 [--fail-rate 0.3]
+    TP_FETCH_URL="http://localhost:8765/{csv}" python tp_fetch.py once
+
+Every TP_FETCH_INTERVAL seconds a background thread downloads each dataset
+on its own asyncio loop, so a slow source never stalls a Streamlit rerun.
+At most TP_FETCH_CONCURRENCY downloads run at a time. Keep-alive
+connections are reused within a round. Failed or truncated downloads are
+retried with backoff. Requests are conditional (ETag / Last-Modified), so an
+unchanged export costs one 304.
+
+A download is streamed to a temp file next to the export and renamed over
+it only once complete and recognisable, so readers see the old file or the
+new one, never part of either. The new export is then ingested into the
+store (`tp_data.refresh`), the shared frame is brought up to date and the
+prewarmer is woken to rebuild the page views.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import tp_data
+import tp_loaders
+import tp_prewarm
+
+log = logging.getLogger(__name__)
+
+# Source of each export; "{csv}" is replaced by its file name and "{name}" by the dataset name. Unset: no fetching
+URL = os.environ.get("TP_FETCH_URL")
+# Sent as "Authorization: Bearer <token>" when set
+TOKEN = os.environ.get("TP_FETCH_TOKEN")
+# Downloads in flight at once, and so open connections
+CONCURRENCY = int(os.environ.get("TP_FETCH_CONCURRENCY", 3))
+# Attempts after the first one, with exponential backoff starting at BACKOFF seconds
+RETRIES = int(os.environ.get("TP_FETCH_RETRIES", 3))
+BACKOFF = float(os.environ.get("TP_FETCH_BACKOFF", 1))
+# Seconds a request may wait on the source, and seconds between fetch rounds
+TIMEOUT = float(os.environ.get("TP_FETCH_TIMEOUT", 60))
+INTERVAL = float(os.environ.get("TP_FETCH_INTERVAL", 300))
+ENABLED = bool(URL)
+
+_CHUNK = 1 << 20
+
+
+class FetchError(Exception):
+    """A download that failed; `retry` tells whether trying again may help."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+def _state_path():
+    return os.path.join(tp_data.STORE_DIR, "fetch.json")
+
+
+def _read_state():
+    try:
+        with open(_state_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _replace_file(path, write):
+    """Write `path` through a temp file in its folder renamed over it once `write(f)` is done."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _write_state(state):
+    os.makedirs(tp_data.STORE_DIR, exist_ok=True)
+    _replace_file(_state_path(), lambda f: f.write(json.dumps(state, indent=1).encode()))
+
+
+def _check_export(name, path):
+    """Raise unless the downloaded file starts with a CSV header holding the dataset's date column."""
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8-sig", errors="replace")
+    if tp_data.DATASETS[name]["date"] not in [c.strip().strip('"') for c in header.split(",")]:
+        raise FetchError(f"{name}: response is not the {tp_data.DATASETS[name]['csv']} export", retry=False)
+
+
+def _download(conn, path, headers, name, dest):
+    """GET `path` on `conn` into the open file `dest`; returns (status, response headers). Blocking."""
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    if resp.status == 304:
+        resp.read()
+        return resp.status, resp.headers
+    if resp.status != 200:
+        resp.read()
+        raise FetchError(f"{name}: HTTP {resp.status}", retry=resp.status >= 500 or resp.status == 429)
+    size = 0
+    while chunk := resp.read(_CHUNK):
+        dest.write(chunk)
+        size += len(chunk)
+    expected = resp.getheader("Content-Length")
+    if expected is not None and size != int(expected):
+        raise FetchError(f"{name}: got {size} of {expected} bytes")
+    return resp.status, resp.headers
+
+
+class Client:
+    """Downloads exports with at most `concurrency` requests (and connections) open at once.
+
+    Idle keep-alive connections are kept per host and reused by the next
+    request; `close` drops them (between rounds, before the source times them out).
+    """
+
+    def __init__(self, url=None, concurrency=None, retries=None, timeout=None):
+        self.url = url or URL
+        self.retries = RETRIES if retries is None else retries
+        self.timeout = TIMEOUT if timeout is None else timeout
+        self._slots = asyncio.Semaphore(concurrency or CONCURRENCY)
+        self._idle = {}  # (scheme, host) -> [connection]
+        self.requests = self.connections = 0
+
+    def _connect(self, scheme, host):
+        idle = self._idle.get((scheme, host))
+        if idle:
+            return idle.pop()
+        self.connections += 1
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, timeout=self.timeout)
+
+    def close(self):
+        for idle in self._idle.values():
+            for conn in idle:
+                conn.close()
+        self._idle.clear()
+
+    async def fetch(self, name, state):
+        """Download and install one export; returns "updated" or "unchanged".
+
+        `state` holds the validators of the installed copy and is updated in place.
+        """
+        spec = tp_data.DATASETS[name]
+        url = urllib.parse.urlsplit(self.url.format(csv=spec["csv"], name=name))
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        headers = {"Accept": "text/csv"}
+        if TOKEN:
+            headers["Authorization"] = f"Bearer {TOKEN}"
+        known = state.get(name, {})
+        if os.path.exists(tp_data.csv_path(name)):
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(BACKOFF * 2 ** (attempt - 1))
+            async with self._slots:
+                conn = self._connect(url.scheme, url.netloc)
+                fd, tmp = tempfile.mkstemp(dir=tp_data.DATA_DIR, prefix=f".{spec['csv']}.", suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as dest:
+                        self.requests += 1
+                        status, reply = await asyncio.to_thread(_download, conn, path, headers, name, dest)
+                        dest.flush()
+                        os.fsync(dest.fileno())
+                except (FetchError, OSError, http.client.HTTPException) as exc:
+                    conn.close()
+                    os.unlink(tmp)
+                    if not isinstance(exc, FetchError):
+                        exc = FetchError(f"{name}: {exc!r}")
+                    if not exc.retry or attempt == self.retries:
+                        raise exc
+                    log.warning("fetching %s failed (%s), retrying", name, exc)
+                    continue
+                self._idle.setdefault((url.scheme, url.netloc), []).append(conn)
+            if status == 304:
+                os.unlink(tmp)
+                return "unchanged"
+            try:
+                _check_export(name, tmp)
+                os.chmod(tmp, 0o644)  # mkstemp creates it private
+                os.replace(tmp, tp_data.csv_path(name))
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            state[name] = {"etag": reply.get("ETag"), "last_modified": reply.get("Last-Modified")}
+            return "updated"
+
+    async def fetch_all(self, names=None):
+        """Fetch every dataset (or `names`) concurrently; {name: "updated" | "unchanged" | error}.
+
+        Updated exports are ingested into the store and their shared frames
+        reloaded off the event loop, then the prewarmer is woken.
+        """
+        names = list(names or tp_data.DATASETS)
+        os.makedirs(tp_data.DATA_DIR, exist_ok=True)
+        state = _read_state()
+        results = await asyncio.gather(*(self.fetch(name, state) for name in names), return_exceptions=True)
+        outcome = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+            outcome[name] = str(result) if isinstance(result, Exception) else result
+        _write_state(state)
+        updated = [name for name in names if outcome[name] == "updated"]
+        await asyncio.gather(*(asyncio.to_thread(_install, name) for name in updated))
+        if updated:
+            tp_prewarm.wake()
+        return outcome
+
+
+def _install(name):
+    tp_data.refresh(name)
+    tp_loaders.get_dataset(name)
+
+
+class Fetcher(threading.Thread):
+    """Background thread running a fetch round every `interval` seconds on its own event loop."""
+
+    def __init__(self, interval=INTERVAL):
+        super().__init__(name="tp-fetch", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self.status = {"runs": 0, "last_run": None, "last_seconds": None, "last_error": None, "datasets": {}}
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                client = Client()
+                try:
+                    self.status["datasets"] = loop.run_until_complete(client.fetch_all())
+                    self.status["last_error"] = None
+                except Exception as exc:  # the installed exports stay in place
+                    log.exception("fetch failed")
+                    self.status["last_error"] = repr(exc)
+                finally:
+                    client.close()
+                self.status.update(runs=self.status["runs"] + 1, last_run=time.time(),
+                                   last_seconds=round(time.perf_counter() - start, 2))
+                self._stop_event.wait(self.interval)
+        finally:
+            loop.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_worker = None
+_lock = threading.Lock()
+
+
+def start():
+    """Start the process-wide fetcher once, when TP_FETCH_URL is set (every rerun may call this)."""
+    global _worker
+    if not ENABLED:
+        return None
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = Fetcher()
+            _worker.start()
+    return _worker
+
+
+def stop():
+    global _worker
+    with _lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
+
+
+def status():
+    worker = _worker
+    return None if worker is None else dict(worker.status, alive=worker.is_alive())
+
+
+class StubHandler(SimpleHTTPRequestHandler):
+    """Serves the export files of a folder like a Talkpush export endpoint, for testing.
+
+    Keep-alive, ETag / Last-Modified validators and 304s as a real source;
+    with `fail_rate` some requests get a 503 or a body cut short.
+    """
+
+    protocol_version = "HTTP/1.1"
+    fail_rate = 0.0
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        st_ = os.stat(path)
+        etag = f'"{st_.st_mtime_ns:x}-{st_.st_size:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if random.random() < self.fail_rate / 2:
+            self.send_error(503)
+            return None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(st_.st_size))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(int(st_.st_mtime)))
+        self.end_headers()
+        return open(path, "rb")
+
+    def copyfile(self, source, outputfile):
+        if random.random() < self.fail_rate / 2:
+            # a connection dropped mid-body
+            outputfile.write(source.read(max(os.fstat(source.fileno()).st_size // 2, 1)))
+            self.close_connection = True
+            return
+        super().copyfile(source, outputfile)
+
+    def log_message(self, format, *args):
+        log.debug(format, *args)
+
+
+def serve_stub(folder, port=8765, fail_rate=0.0):
+    """Serve `folder` on `port` until interrupted (see `StubHandler`)."""
+    handler = type("Handler", (StubHandler,), {"fail_rate": fail_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), lambda *a: handler(*a, directory=folder))
+    print(f"serving {folder} on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    stub = commands.add_parser("stub", help="serve a folder of exports as a local source")
+    stub.add_argument("--folder", required=True)
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--fail-rate", type=float, default=0.0, help="share of requests that fail or are cut short")
+    commands.add_parser("once", help="run one fetch round against TP_FETCH_URL and exit")
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        serve_stub(args.folder, args.port, args.fail_rate)
+        return 0
+    if not URL:
+        parser.error("set TP_FETCH_URL")
+    client = Client()
+
+    async def once():
+        try:
+            return await client.fetch_all()
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    outcome = asyncio.run(once())
+    for name, result in outcome.items():
+        print(f"{name:<16}{result}")
+    print(f"{client.requests} requests over {client.connections} connections in "
+          f"{time.perf_counter() - start:.2f} s")
+    return 0 if all(r in ("updated", "unchanged") for r in outcome.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
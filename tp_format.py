@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+# Percentages and number labels shared by the dashboard pages. Shares are
+# computed with one groupby transform instead of a Python lambda per group;
+# chart labels are left to Plotly's `texttemplate` and table number formats
+# to Streamlit's `column_config`, so no string column is built for them.
+
+
+def group_share(df, by, col):
+    """Percentage each row's `col` makes up of its `by` group total."""
+    return df[col] / df.groupby(by, observed=True)[col].transform("sum") * 100
+
+
+def format_numbers(values, fmt="{:.2f}"):
+    """Format a Series (or a block of DataFrame columns) as strings with `fmt`.
+
+    Each distinct value is formatted once and the labels are mapped back by
+    position; NaN formats like any other value (to "nan").
+    """
+    arr = values.to_numpy()
+    codes, uniques = pd.factorize(arr.ravel(), use_na_sentinel=False)
+    labels = np.array([fmt.format(v) for v in uniques.tolist()], dtype=object)[codes].reshape(arr.shape)
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(labels, index=values.index, columns=values.columns)
+    return pd.Series(labels, index=values.index, name=values.name)
+
+
+def column_config(formats):
+    """Streamlit `column_config` showing the given columns with printf-style number formats."""
+    import streamlit as st
+    return {col: st.column_config.NumberColumn(format=fmt) for col, fmt in formats.items()}
@@ -0,0 +1,108 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import tp_data
+import tp_loaders
+import tp_profile
+import tp_rollup
+
+# Per-day score histograms on a fixed grid, so percentiles and distribution
+# charts for any window are read off merged bins instead of sorting rows.
+# Scores are bounded and exported with at most two decimals, so the 0.01
+# grid holds every value exactly. Rows are sparse: one per day, dims,
+# measure and occupied bin, with the row count `n`.
+HISTOGRAMS = {
+    "tp_raw_overall": {
+        "dataset": "tp_raw",
+        "dims": ["TALKSCORE_CEFR"],
+        "measures": ["TALKSCORE_OVERALL"],
+        "where": lambda df: df["TALKSCORE_OVERALL"] > 0,
+    },
+    "failure_scores": {
+        "dataset": "failure_reasons",
+        "dims": ["FAILED_REASON", "CEFR"],
+        "measures": ["VOC", "FLU", "GRAM", "PRON", "OVERALL"],
+    },
+}
+# Bin b holds the score LOW + b / SCALE; scores off this grid are rejected
+# rather than rounded or clipped into a bin, so quantiles stay exact
+LOW, HIGH, SCALE = 0, 10, 100
+BINS = (HIGH - LOW) * SCALE + 1
+
+
+def build_daily_histogram(df, date_col, dims=(), measures=(), where=None):
+    """Rows per (DAY, dims, measure, bin); missing scores are not counted.
+
+    Raises ValueError naming the measure when a score lies outside LOW..HIGH
+    or between two bins.
+    """
+    if where is not None:
+        df = df[where(df)]
+    df = df[df[date_col].notna()]
+    day = df[date_col].dt.normalize()
+    frames = []
+    for m in measures:
+        keep = df[m].notna()
+        scaled = (tp_data.widen(df[m][keep]).to_numpy() - LOW) * SCALE
+        bins = np.rint(scaled)
+        bad = (bins < 0) | (bins >= BINS) | (np.abs(scaled - bins) > 1e-3)
+        if bad.any():
+            raise ValueError(f"{m}: scores off the {1 / SCALE:g} grid over {LOW}..{HIGH} "
+                             f"({', '.join(map(str, df[m][keep][bad].unique()[:5]))})")
+        work = pd.DataFrame({"DAY": day[keep], **{d: df[d][keep] for d in dims}, "bin": bins.astype(np.int16)})
+        counts = work.groupby(["DAY", *dims, "bin"], observed=True, dropna=False).size().rename("n").reset_index()
+        counts.insert(len(dims) + 1, "measure", m)
+        frames.append(counts)
+    hist = tp_data.concat_frames(frames) if frames else pd.DataFrame(columns=["DAY", *dims, "measure", "bin", "n"])
+    return hist.astype({"measure": pd.CategoricalDtype(list(measures))})
+
+
+_histograms = {}  # name -> (dataset version, histogram)
+_lock = threading.Lock()
+
+
+@tp_profile.timed("histogram")
+def get_histogram(name):
+    """Daily histogram for the current version of its dataset, built once per refresh."""
+    spec = HISTOGRAMS[name]
+    date_col = tp_data.DATASETS[spec["dataset"]]["date"]
+    keys = [*spec["dims"], "measure", "bin"]
+    return tp_loaders.summarise(
+        "histogram", _histograms, _lock, name, spec["dataset"],
+        lambda rows: build_daily_histogram(rows, date_col, spec["dims"], spec["measures"], spec.get("where")),
+        lambda hist, cutoff: hist[hist["DAY"] < cutoff],
+        lambda hist, delta: tp_rollup.merge_cubes(hist, delta, keys))
+
+
+def quantiles(hist, by, qs):
+    """Exact quantiles per `by` group of histogram rows, as ``Series.quantile`` (linear) on the raw scores.
+
+    `qs` maps output column -> quantile. Each group costs O(bins) however
+    many rows it counts.
+    """
+    counts = hist[hist["n"] > 0].groupby([*by, "bin"], observed=True)["n"].sum()
+    rows = []
+    for key, group in counts.groupby(level=list(range(len(by))), observed=True, sort=False):
+        cum = group.to_numpy().cumsum()
+        values = LOW + group.index.get_level_values("bin").to_numpy() / SCALE
+        row = dict(zip(by, key if isinstance(key, tuple) else (key,)))
+        for column, q in qs.items():
+            h = (cum[-1] - 1) * q
+            below = int(np.floor(h))
+            a = values[np.searchsorted(cum, below, side="right")]
+            b = values[np.searchsorted(cum, min(below + 1, cum[-1] - 1), side="right")]
+            t = h - below
+            # numpy's lerp, so results match pandas to the last bit
+            row[column] = a + (b - a) * t if t < 0.5 else b - (b - a) * (1 - t)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=[*by, *qs]).astype({c: hist[c].dtype for c in by})
+
+
+def distribution(hist, by, width=0.1):
+    """Row counts per `by` group and score bucket of `width` (e.g. for a histogram chart)."""
+    step = max(int(round(width * SCALE)), 1)
+    score = LOW + (hist["bin"].to_numpy() // step) * step / SCALE
+    out = hist.assign(Score=score).groupby([*by, "Score"], observed=True)["n"].sum()
+    return out.rename("Count").reset_index()
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+import tp_data
+import tp_pages
+import tp_shared
+
+# Seconds a dataset may sit unused before its frame is dropped from memory
+DATASET_TTL = int(os.environ.get("TP_DATASET_TTL", 3600))
+
+# Columns the dashboard pages read from each export (declared in the page
+# registry); one shared frame holds their union so every page and session
+# works off the same copy
+DATASET_COLUMNS = tp_pages.dataset_columns()
+
+
+class DatasetRegistry:
+    """Process-wide store of loaded datasets, keyed by dataset name.
+
+    Lives at module level, so like ``st.cache_resource`` it is shared by every
+    session and rerun and hands out the same frame without copying it.
+    Callers must treat the frames as read-only. A frame is reloaded (or, after
+    an incremental ingest, patched) when its source export changes and is
+    dropped after ``ttl`` seconds without use.
+    """
+
+    def __init__(self, ttl=DATASET_TTL):
+        self.ttl = ttl
+        self._entries = {}  # (name, window start month or None) -> {"version", "frame", "last_used"}
+        self._versions = {}  # name -> store version last seen
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in tp_data.DATASETS}
+        self.hits = self.misses = 0
+
+    def get(self, name, since=None):
+        """Shared frame of a dataset; with `since`, only rows dated on/after it.
+
+        Windowed frames are read from the month partitions the window touches
+        and cached per (dataset, first month), so e.g. all "Last 30 days"
+        views of one day share a single small frame.
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        month = None if since is None else pd.Timestamp(since).to_period("M").to_timestamp()
+        # one loader per dataset; other sessions asking for it wait here
+        with self._load_locks[name]:
+            version = tp_data.refresh(name)
+            self._versions[name] = version
+            entry = self._entries.get((name, month))
+            if entry is None or entry["version"] != version:
+                self.misses += 1
+                # incremental refreshes are applied to the full frame already in memory
+                changes = tp_data.changes_since(name, entry["version"]) if entry and month is None else None
+                if changes is not None:
+                    frame = tp_data.apply_changes(entry["frame"], name, changes)
+                else:
+                    frame = tp_data.load(name, columns=DATASET_COLUMNS.get(name), since=month)
+                entry = {"version": version, "frame": frame}
+                with self._lock:
+                    self._entries[(name, month)] = entry
+            else:
+                self.hits += 1
+            entry["last_used"] = now
+        frame = entry["frame"]
+        if since is None:
+            return frame
+        return frame[frame[tp_data.DATASETS[name]["date"]] >= since]
+
+    def version(self, name):
+        return self._versions.get(name)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def invalidate(self, name=None):
+        """Drop one dataset (or all of them) so the next get reloads it."""
+        with self._lock:
+            for key in [k for k in self._entries if name is None or k[0] == name]:
+                del self._entries[key]
+
+    def _sweep(self, now):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if now - e.get("last_used", now) > self.ttl]:
+                del self._entries[key]
+
+
+REGISTRY = DatasetRegistry()
+
+
+def get_dataset(name, since=None):
+    return REGISTRY.get(name, since)
+
+
+def summarise(kind, cache, lock, key, name, build, cut, merge):
+    """Per-day summary of dataset `name`, kept in `cache` (key -> (version, summary)) per store version.
+
+    `build(rows)` summarises a frame, `cut(summary, day)` drops the days
+    on/after `day` and `merge(summary, delta)` adds the summary of new rows.
+    After an incremental ingest only the new rows are summarised (see
+    `tp_data.changes_since`). Summaries are also kept in the shared cache
+    under `kind`, `key` and the version, so other processes (and this one
+    after a restart) reuse them without loading the dataset.
+    """
+    version = tp_data.refresh(name)
+    with lock:
+        cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    changes = tp_data.changes_since(name, cached[0]) if cached else None
+    if changes is not None:
+        summary = cached[1]
+        for cutoff, rows in changes:
+            if cutoff is not None:
+                summary = cut(summary, cutoff)
+            if rows is not None:
+                summary = merge(summary, build(rows))
+        tp_shared.put(f"{kind}:{key}:{version}", summary)
+    else:
+        shared = f"{kind}:{key}:{version}"
+        summary, held = tp_shared.claim(shared)
+        if summary is None:
+            try:
+                df = get_dataset(name)
+                # a newer export may have landed since the refresh above
+                version = REGISTRY.version(name)
+                summary = build(df)
+                tp_shared.put(f"{kind}:{key}:{version}", summary)
+            finally:
+                if held:
+                    tp_shared.release(shared)
+    with lock:
+        cache[key] = (version, summary)
+    return summary
+
+
+def split_window(name, since):
+    """(first whole day, rows of the partly covered day before it) of a window starting at `since`.
+
+    Per-day summaries answer the whole days; only the rows of the day `since`
+    falls in (None when it is midnight or None) have to be read from the frame.
+    """
+    if since is None:
+        return None, None
+    since = pd.Timestamp(since)
+    first = since.normalize()
+    if since == first:
+        return first, None
+    # the windowed frame only reads the month partitions from `since` on
+    df = get_dataset(name, since=since)
+    first += pd.Timedelta(days=1)
+    return first, df[df[tp_data.DATASETS[name]["date"]] < first]
+
+
+def invalidate(name=None):
+    REGISTRY.invalidate(name)
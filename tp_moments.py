@@ -0,0 +1,146 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import tp_data
+import tp_loaders
+import tp_profile
+
+# Per-day co-moments of a dataset's score columns, so a correlation matrix
+# over any window is combined from days instead of a pass over every row.
+# `where` filters the rows first, as in tp_rollup.CUBES.
+MOMENTS = {
+    "talkscore": {
+        "columns": ["TALKSCORE_VOCAB", "TALKSCORE_FLUENCY", "TALKSCORE_GRAMMAR", "TALKSCORE_COMPREHENSION",
+                    "TALKSCORE_PRONUNCIATION", "TALKSCORE_OVERALL"],
+        "where": lambda df: df["TALKSCORE_OVERALL"] > 0,
+    },
+}
+
+# One entry per day. For columns i, j over the rows where both are present:
+# n[d, i, j] rows, mean[d, i, j] the mean of i, m2[d, i, j] the sum of squared
+# deviations of i and c[d, i, j] the sum of co-deviations (symmetric), so
+# missing values are handled pairwise like DataFrame.corr.
+Moments = namedtuple("Moments", "days n mean m2 c")
+
+
+def build_daily_moments(df, date_col, columns, where=None):
+    """Moments of `columns` per day, centred on each day's own means."""
+    if where is not None:
+        df = df[where(df)]
+    df = df[df[date_col].notna()]
+    day_codes, days = pd.factorize(df[date_col].dt.normalize(), sort=True)
+    k, d = len(columns), len(days)
+    x = np.column_stack([tp_data.widen(df[c]).to_numpy(dtype=np.float64) for c in columns]) if len(df) \
+        else np.empty((0, k))
+    present = ~np.isnan(x)
+    n, mean, m2, c = (np.zeros((d, k, k)) for _ in range(4))
+
+    def day_sums(values):
+        return np.bincount(day_codes, weights=values, minlength=d)
+
+    if present.all():
+        # no missing values: every pair shares the same rows
+        count = np.bincount(day_codes, minlength=d).astype(np.float64)
+        means = np.column_stack([day_sums(x[:, i]) for i in range(k)]) / np.maximum(count, 1)[:, None]
+        dev = x - means[day_codes]
+        for i in range(k):
+            for j in range(i, k):
+                c[:, i, j] = c[:, j, i] = day_sums(dev[:, i] * dev[:, j])
+        n[:] = count[:, None, None]
+        mean[:] = means[:, :, None]
+        m2[:] = np.diagonal(c, axis1=1, axis2=2)[:, :, None]
+        return Moments(days, n, mean, m2, c)
+
+    for i in range(k):
+        for j in range(i, k):
+            both = present[:, i] & present[:, j]
+            codes = day_codes[both]
+            xi, xj = x[both, i], x[both, j]
+            count = np.bincount(codes, minlength=d).astype(np.float64)
+            safe = np.maximum(count, 1)
+            mi = np.bincount(codes, weights=xi, minlength=d) / safe
+            mj = np.bincount(codes, weights=xj, minlength=d) / safe
+            di, dj = xi - mi[codes], xj - mj[codes]
+            n[:, i, j] = n[:, j, i] = count
+            mean[:, i, j], mean[:, j, i] = mi, mj
+            m2[:, i, j] = np.bincount(codes, weights=di * di, minlength=d)
+            m2[:, j, i] = np.bincount(codes, weights=dj * dj, minlength=d)
+            c[:, i, j] = c[:, j, i] = np.bincount(codes, weights=di * dj, minlength=d)
+    return Moments(days, n, mean, m2, c)
+
+
+def combine(moments):
+    """Total (n, mean, m2, c) over all days of `moments`.
+
+    Chan et al.'s pairwise update generalised to many parts: each day's
+    deviations are already centred, so the days are added around the overall
+    mean without the cancellation of a sum-of-squares formula.
+    """
+    n, mean, m2, c = moments.n, moments.mean, moments.m2, moments.c
+    total = n.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = (n * mean).sum(axis=0) / total
+    di = np.where(n > 0, mean - mu, 0.0)
+    dj = np.where(n > 0, mean.swapaxes(1, 2) - mu.T, 0.0)
+    return total, mu, m2.sum(axis=0) + (n * di * di).sum(axis=0), c.sum(axis=0) + (n * di * dj).sum(axis=0)
+
+
+def _select(moments, mask):
+    return Moments(moments.days[mask], moments.n[mask], moments.mean[mask], moments.m2[mask], moments.c[mask])
+
+
+def merge_moments(moments, delta):
+    """Add the daily moments of `delta` into `moments`; days in both are combined."""
+    if not len(delta.days):
+        return moments
+    days = moments.days.append(delta.days)
+    parts = [np.concatenate([a, b]) for a, b in zip(moments[1:], delta[1:])]
+    joined = Moments(days, *parts)
+    unique = days.unique().sort_values()
+    out = Moments(unique, *(np.zeros((len(unique),) + p.shape[1:]) for p in parts))
+    for pos, day in enumerate(unique):
+        total, mu, m2, c = combine(_select(joined, days == day))
+        out.n[pos], out.mean[pos], out.m2[pos], out.c[pos] = total, np.nan_to_num(mu), m2, c
+    return out
+
+
+_moments = {}  # dataset -> (dataset version, Moments)
+_lock = threading.Lock()
+
+
+@tp_profile.timed("moments")
+def get_moments(name):
+    """Daily moments for the current version of a dataset, built once per refresh."""
+    spec = MOMENTS[name]
+    date_col = tp_data.DATASETS[name]["date"]
+    return tp_loaders.summarise(
+        "moments", _moments, _lock, name, name,
+        lambda rows: build_daily_moments(rows, date_col, spec["columns"], spec.get("where")),
+        lambda moments, cutoff: _select(moments, moments.days < cutoff),
+        merge_moments)
+
+
+def corr(name, columns=None, since=None):
+    """Pearson correlation of `columns` over the rows dated on/after `since`, like `DataFrame.corr`.
+
+    Whole days come from the daily moments; only the rows of the day `since`
+    falls in are read from the frame.
+    """
+    spec = MOMENTS[name]
+    columns = list(columns or spec["columns"])
+    moments = get_moments(name)
+    first, partial = tp_loaders.split_window(name, since)
+    if first is not None:
+        moments = _select(moments, moments.days >= first)
+    if partial is not None and len(partial):
+        head = build_daily_moments(partial, tp_data.DATASETS[name]["date"], spec["columns"], spec.get("where"))
+        moments = Moments(head.days.append(moments.days),
+                          *(np.concatenate([a, b]) for a, b in zip(head[1:], moments[1:])))
+    _, _, m2, c = combine(moments)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = c / np.sqrt(m2 * m2.T)
+    idx = [spec["columns"].index(col) for col in columns]
+    return pd.DataFrame(matrix[np.ix_(idx, idx)], index=columns, columns=columns)
@@ -0,0 +1,68 @@
+import importlib
+
+# Page registry: sidebar label -> module rendering it and the dataset columns
+# it reads. Page modules (and their plotting imports) are only imported the
+# first time their page is opened. "cubes" lists the daily cubes (see
+# tp_rollup.CUBES) a page rolls up, built concurrently ahead of it. Pages
+# flagged "admin" are only listed for admins (see `titles`).
+PAGES = {
+    "Home": {
+        "module": "tp_pages.home",
+        "datasets": {"tp_raw": ["DATE_DAY", "TALKSCORE_OVERALL", "TALKSCORE_VOCAB", "TALKSCORE_FLUENCY",
+                                "TALKSCORE_GRAMMAR", "TALKSCORE_PRONUNCIATION", "TEST_COMPLETED", "CAMP_SITE",
+                                "FOR_TS_REVIEW", "NEW_SOURCE", "TALKSCORE_CEFR"]},
+        "cubes": ["tp_raw_sites", "tp_raw_scores", "tp_raw_sources"],
+    },
+    "Candidate Info": {
+        "module": "tp_pages.candidate_info",
+        "datasets": {"candidate_info": ["INVITATIONDT", "CAMPAIGNTITLE", "SOURCE", "ASSIGNEDMANAGER", "FOLDER",
+                                        "COMPLETIONMETHOD", "REPEATAPPLICATION", "CAMPAIGN_TYPE", "CAMPAIGN_SITE"]},
+    },
+    "Talkscore Analysis": {
+        "module": "tp_pages.talkscore_analysis",
+        "datasets": {"talkscore": ["INVITATIONDT_UTC", "REJECTED_REASON", "TALKSCORE_VOCAB", "TALKSCORE_FLUENCY",
+                                   "TALKSCORE_GRAMMAR", "TALKSCORE_COMPREHENSION", "TALKSCORE_PRONUNCIATION",
+                                   "TALKSCORE_OVERALL"]},
+    },
+    "Failure Reasons": {
+        "module": "tp_pages.failure_reasons",
+        "datasets": {"failure_reasons": ["FAILED_REASON", "CEFR", "VOC", "FLU", "GRAM", "PRON", "OVERALL",
+                                         "DATE_DAY"]},
+        "cubes": ["failure_reasons"],
+    },
+    "CEFR Dive": {
+        "module": "tp_pages.cefr_dive",
+        "datasets": {"tp_raw": ["DATE_DAY", "TALKSCORE_OVERALL", "TALKSCORE_CEFR"]},
+        "cubes": ["tp_raw_scores"],
+    },
+    "HM actions": {
+        "module": "tp_pages.hm_actions",
+        "datasets": {"folder_logs": ["DATE_DAY", "MOVED_BY", "REJECTED_BY_MANAGER", "MOVED_BY_MANAGER",
+                                     "FOLDER_TO_TITLE", "CLEANED_MOVER_EMAIL"]},
+        "cubes": ["folder_actions", "folder_movers"],
+    },
+    "Admin": {
+        "module": "tp_pages.admin",
+        "datasets": {},
+        "admin": True,
+    },
+}
+
+
+def dataset_columns():
+    """Union of the columns every page reads, per dataset."""
+    columns = {}
+    for page in PAGES.values():
+        for name, cols in page["datasets"].items():
+            columns.setdefault(name, [])
+            columns[name] += [c for c in cols if c not in columns[name]]
+    return columns
+
+
+def titles(admin=False):
+    """Sidebar labels, including the admin-only pages when `admin`."""
+    return [title for title, page in PAGES.items() if admin or not page.get("admin")]
+
+
+def get_page(title):
+    return importlib.import_module(PAGES[title]["module"])
@@ -0,0 +1,88 @@
+import pandas as pd
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_data
+import tp_fetch
+import tp_loaders
+import tp_prewarm
+import tp_profile
+import tp_rollup
+import tp_shared
+
+
+def _ratio(stats):
+    total = stats["hits"] + stats["misses"]
+    return f"{stats['hits'] / total:.0%}" if total else "-"
+
+
+def stage_summary(records):
+    """Per page and stage: reruns, mean/p95 inclusive ms, mean self ms and memory delta."""
+    rows = [{"page": r["page"], "stage": name, **s} for r in records for name, s in r.get("stages", {}).items()]
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    return df.groupby(["page", "stage"]).agg(
+        reruns=("ms", "size"), mean_ms=("ms", "mean"), p95_ms=("ms", lambda x: x.quantile(0.95)),
+        self_ms=("self_ms", "mean"), mem_mb=("mem_mb", "mean")).round(2).sort_values("mean_ms", ascending=False)
+
+
+def render():
+    st.title("Admin")
+
+    # Cache effectiveness
+    st.subheader("Caches")
+    caches = {"Datasets": tp_loaders.REGISTRY.stats(), "Daily cubes": tp_rollup.stats(), "Page views": tp_cache.stats(),
+              f"Shared ({tp_shared.BACKEND})": tp_shared.stats()}
+    cols = st.columns(len(caches))
+    for col, (label, stats) in zip(cols, caches.items()):
+        with col:
+            st.metric(label=f"{label} hit ratio", value=_ratio(stats),
+                      help=f"{stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+
+    prewarm = tp_prewarm.status()
+    if prewarm is None:
+        st.caption("Prewarming is off")
+    else:
+        last = "never" if prewarm["last_run"] is None else pd.to_datetime(prewarm["last_run"], unit="s").strftime("%Y-%m-%d %H:%M:%S")
+        st.caption(f"Prewarm: {prewarm['runs']} runs, last {last} ({prewarm['last_seconds']} s)"
+                   + (f", error: {prewarm['last_error']}" if prewarm["last_error"] else ""))
+
+    fetch = tp_fetch.status()
+    if fetch is None:
+        st.caption("Fetching is off (TP_FETCH_URL is not set)")
+    else:
+        last = "never" if fetch["last_run"] is None else pd.to_datetime(fetch["last_run"], unit="s").strftime("%Y-%m-%d %H:%M:%S")
+        st.caption(f"Fetch: {fetch['runs']} runs, last {last} ({fetch['last_seconds']} s)"
+                   + (f", error: {fetch['last_error']}" if fetch["last_error"] else ""))
+        if fetch["datasets"]:
+            st.dataframe(pd.Series(fetch["datasets"], name="last fetch").rename_axis("dataset"), use_container_width=True)
+
+    records = tp_profile.reruns()
+    st.subheader("Stages")
+    st.dataframe(stage_summary(records), use_container_width=True)
+
+    st.subheader("Recent reruns")
+    recent = pd.DataFrame([{k: r.get(k) for k in ["ts", "session", "page", "period", "view_cache", "wall_ms", "mem_mb"]}
+                           for r in reversed(records)])
+    if len(recent):
+        recent["ts"] = pd.to_datetime(recent["ts"], unit="s")
+    st.dataframe(recent, use_container_width=True)
+
+    st.subheader("Sessions")
+    sessions = pd.DataFrame.from_dict(tp_profile.sessions(), orient="index")
+    if len(sessions):
+        sessions["last"] = pd.to_datetime(sessions["last"], unit="s")
+    st.dataframe(sessions, use_container_width=True)
+
+    st.subheader("Dataset memory")
+    # parses every export twice, so only on request
+    if st.button("Measure default vs. schema dtypes"):
+        st.dataframe(tp_data.memory_report(), use_container_width=True)
+
+    st.subheader("Chart payloads")
+    st.dataframe(tp_charts.payload_report(), use_container_width=True)
+
+    st.download_button("Export reruns (JSON lines)", tp_profile.export_jsonl(), file_name="tp_profile.jsonl",
+                       mime="application/x-ndjson")
@@ -0,0 +1,137 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_data
+import tp_sql
+import tp_topn
+
+PERIODS = ["Last 30 days", "Last 12 Weeks", "Last 1 Year", "All Time"]
+# Define colors for graphs
+colors = ["#001E44", "#F5F5F5", "#E53855", "#B4BBBE", "#2F76B9", "#3B9790", "#F5BA2E", "#6A4C93", "#F77F00"]
+
+
+def build(time_filter, today=None):
+    # Load data for the selected period only (the window is pushed down to the month partitions)
+    max_date = tp_data.latest("candidate_info")
+    if time_filter == "Last 30 days":
+        since = max_date - pd.DateOffset(days=30)
+        date_freq = 'D'
+    elif time_filter == "Last 12 Weeks":
+        since = max_date - pd.DateOffset(weeks=12)
+        date_freq = 'W'
+    elif time_filter == "Last 1 Year":
+        since = max_date - pd.DateOffset(years=1)
+        date_freq = 'M'
+    else:
+        since = None
+        date_freq = 'M'
+
+    # Graph 1: Lead Count Trend
+    #lead_trend = filtered_data.resample(date_freq, on='INVITATIONDT').count()
+
+    campaigns_error = 0
+    if tp_sql.ENABLED:
+        # counted by DuckDB in the store; only the top rows come back
+        def top(column, n):
+            return tp_sql.top_counts("candidate_info", column, n, since)
+        repeat_daily = tp_sql.daily_counts("candidate_info", since, "REPEATAPPLICATION")
+        repeat_applications = repeat_daily.resample(date_freq).sum().to_frame("REPEATAPPLICATION")
+    else:
+        # summed from the daily counters in one go; only the window's first, partial day is counted from rows
+        tops = tp_topn.top_counts("candidate_info", {'CAMPAIGNTITLE': 10, 'SOURCE': 10, 'ASSIGNEDMANAGER': 10,
+                                                     'FOLDER': 10, 'COMPLETIONMETHOD': 5, 'CAMPAIGN_TYPE': 5,
+                                                     'CAMPAIGN_SITE': 5}, since)
+
+        def top(column, n):
+            return tops[column]
+        repeat_daily = tp_topn.daily_counts("candidate_info", 'REPEATAPPLICATION', True, since)
+        campaigns_error = tp_topn.error_bound("candidate_info", 'CAMPAIGNTITLE', since)
+        repeat_applications = repeat_daily.resample(date_freq).sum().to_frame("REPEATAPPLICATION")
+
+    return {
+        "top_campaigns": top('CAMPAIGNTITLE', 10),
+        "campaigns_error": campaigns_error,
+        "top_sources": top('SOURCE', 10),
+        "top_managers": top('ASSIGNEDMANAGER', 10),
+        "top_folders": top('FOLDER', 10),
+        "top_completion_methods": top('COMPLETIONMETHOD', 5),
+        "repeat_applications": repeat_applications,
+        "top_campaign_types": top('CAMPAIGN_TYPE', 5),
+        "top_campaign_sites": top('CAMPAIGN_SITE', 5),
+    }
+
+
+#fig1 = px.line(lead_trend, x=lead_trend.index, y='RECORDID', title='Lead Count Trend', labels={'RECORDID': 'Counts'}, color_discrete_sequence=[colors[0]])
+
+
+def fig2(data):
+    # Graph 2: Top 10 Campaign Titles
+    top_campaigns = data["top_campaigns"]
+    # approximate counters (TP_TOPN_CAPACITY) may undercount
+    title = 'Top 10 Campaign Titles' + (f' (counts may be low by up to {data["campaigns_error"]:,})' if data["campaigns_error"] else '')
+    return px.bar(top_campaigns, x=top_campaigns.index, y=top_campaigns.values, title=title, labels={'y': 'Counts'}, color_discrete_sequence=[colors[2]])
+
+
+def fig3(data):
+    # Graph 3: Top 10 Source Counts
+    top_sources = data["top_sources"]
+    return px.bar(top_sources, x=top_sources.index, y=top_sources.values, title='Top 10 Source Counts', labels={'y': 'Counts'}, color_discrete_sequence=[colors[3]])
+
+
+def fig4(data):
+    # Graph 4: Top 10 Assigned Manager Counts
+    top_managers = data["top_managers"]
+    return px.bar(top_managers, x=top_managers.index, y=top_managers.values, title='Top 10 Assigned Manager Counts', labels={'y': 'Counts'}, color_discrete_sequence=[colors[4]])
+
+
+def fig5(data):
+    # Graph 5: Top 10 Folder Occurrences
+    top_folders = data["top_folders"]
+    return px.bar(top_folders, x=top_folders.index, y=top_folders.values, title='Top 10 Folder Occurrences', labels={'y': 'Counts'}, color_discrete_sequence=[colors[5]])
+
+
+def fig6(data):
+    # Graph 6: Top 5 Completion Methods
+    top_completion_methods = data["top_completion_methods"]
+    return px.bar(top_completion_methods, x=top_completion_methods.index, y=top_completion_methods.values, title='Top 5 Completion Methods', labels={'y': 'Counts'}, color_discrete_sequence=[colors[6]])
+
+
+def fig7(data):
+    # Graph 7: Repeat Application Counts
+    repeat_applications = data["repeat_applications"]
+    return px.bar(repeat_applications, x=repeat_applications.index, y='REPEATAPPLICATION', title='Repeat Application Counts', labels={'REPEATAPPLICATION': "Counts-'REPEATAPPLICATION'"}, color_discrete_sequence=[colors[7]])
+
+
+def fig8(data):
+    # Graph 8: Top 5 Campaign Type Occurrences
+    top_campaign_types = data["top_campaign_types"]
+    return px.bar(top_campaign_types, x=top_campaign_types.index, y=top_campaign_types.values, title='Top 5 Campaign Type Occurrences', labels={'y': 'Counts'}, color_discrete_sequence=[colors[8]])
+
+
+def fig9(data):
+    # Graph 9: Lead Counts by Campaign Site
+    top_campaign_sites = data["top_campaign_sites"]
+    return px.bar(top_campaign_sites, x=top_campaign_sites.index, y=top_campaign_sites.values, title='Lead Counts by Campaign Site', labels={'y': 'Counts'}, color_discrete_sequence=[colors[0]])
+
+
+FIGURES = {"fig2": fig2, "fig3": fig3, "fig4": fig4, "fig5": fig5, "fig6": fig6, "fig7": fig7, "fig8": fig8, "fig9": fig9}
+
+
+def tables(data):
+    return {}
+
+
+def render():
+    st.title("Candidate Info")
+
+    # Sidebar dropdown
+    col = st.columns(3)
+    with col[2]:
+        st.header("Select Time Period")
+        time_filter = st.selectbox("Time Period", PERIODS)
+
+    _, charts, _ = tp_cache.view_async(__name__, time_filter)
+    tp_charts.stream(charts, {name: st.empty() for name in charts}, use_container_width=True)
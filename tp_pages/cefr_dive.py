@@ -0,0 +1,81 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_hist
+import tp_pivot
+import tp_rollup
+
+PERIODS = ["Last 12 Months", "Last 12 Weeks", "Last 30 days"]
+custom_colors = ["#2F76B9", "#3B9790", "#F5BA2E", "#6A4C93", "#F77F00", "#B4BBBE", "#e6657b", "#026df5", "#5aede2"]
+
+
+def build(aggregation_option, today=None):
+    today = pd.Timestamp.today() if today is None else today
+    # Load the daily rollup of scored candidates (TALKSCORE_OVERALL > 0)
+    df_scores = tp_rollup.rollup(tp_rollup.get_cube("tp_raw_scores"), aggregation_option, today, dims=["TALKSCORE_CEFR"])
+
+    #FIG calculate dataframe for CEFR
+    df_cefr_count = df_scores[["DATE_GROUP", "TALKSCORE_CEFR", "n"]].rename(columns={"n": "Count"})
+
+    # Score histograms of the same rows, for percentiles and the distribution chart
+    hist = tp_rollup.rollup(tp_hist.get_histogram("tp_raw_overall"), aggregation_option, today,
+                            dims=["TALKSCORE_CEFR", "measure", "bin"])
+    df_cefr_hist = tp_hist.distribution(hist, ["TALKSCORE_CEFR"])
+
+    # FIG 2 Group by TALKSCORE_CEFR and calculate min, percentiles, max, and count
+    cefr_summary = df_scores.rename(columns={"TALKSCORE_OVERALL__min": "Min_", "TALKSCORE_OVERALL__max": "Max_", "n": "Count"})
+    percentiles = tp_hist.quantiles(hist, ["DATE_GROUP", "TALKSCORE_CEFR"], {"P10_": 0.1, "Median_": 0.5, "P90_": 0.9})
+    cefr_summary = cefr_summary.merge(percentiles, on=["DATE_GROUP", "TALKSCORE_CEFR"], how="left")
+    cefr_summary = cefr_summary[["DATE_GROUP", "TALKSCORE_CEFR", "Min_", "P10_", "Median_", "P90_", "Max_", "Count"]]
+    # FIG 2 Pivot the table so that DATE_GROUP is the top-level column and stats are below
+    cefr_summary_pivot = tp_pivot.materialize(cefr_summary, "TALKSCORE_CEFR", "DATE_GROUP",
+                                              ["Min_", "P10_", "Median_", "P90_", "Max_", "Count"],
+                                              labels={"DATE_GROUP": "%b-%d-%Y"})
+
+    return {"df_cefr_count": df_cefr_count, "df_cefr_hist": df_cefr_hist, "cefr_summary_pivot": cefr_summary_pivot}
+
+
+def CEFR_Monthly(data):
+        #FIG 1 TALKSCORE_CEFR over the time
+    return px.bar(data["df_cefr_count"],
+        x="DATE_GROUP", y="Count",
+        color="TALKSCORE_CEFR",  # Different colors for each CEFR level
+        barmode="stack", title="Distribution of TALKSCORE_CEFR Levels",
+        labels={"DATE_GROUP": "time", "Count": "Number of Candidates"},
+        text_auto=True,color_discrete_sequence=custom_colors ) # Show counts on bars
+
+
+def CEFR_Distribution(data):
+        #FIG 3 TALKSCORE_OVERALL distribution over the whole period, in 0.1 steps
+    return px.bar(data["df_cefr_hist"],
+        x="Score", y="Count",
+        color="TALKSCORE_CEFR",
+        barmode="stack", title="Distribution of TALKSCORE_OVERALL by CEFR Level",
+        labels={"Score": "TALKSCORE_OVERALL", "Count": "Number of Candidates"},
+        color_discrete_sequence=custom_colors)
+
+
+FIGURES = {"CEFR_Monthly": CEFR_Monthly, "CEFR_Distribution": CEFR_Distribution}
+
+
+def tables(data):
+    return {"Talkscore Overall Summary by CEFR (Min, P10, Median, P90, Max)": data["cefr_summary_pivot"]}
+
+
+def render():
+    st.title("CEFR Dive")
+
+    col = st.columns(3)
+    with col[2]: aggregation_option = st.selectbox("Time Period", PERIODS)
+    _, charts, tabs = tp_cache.view_async(__name__, aggregation_option)
+
+    # display charts (each drawn into its slot once built, the tables meanwhile)
+    slots = {name: st.empty() for name in charts}
+
+    for title, table in tabs.items():
+        st.subheader(title)
+        tp_pivot.show(table, key=f"{title}:{aggregation_option}")
+    tp_charts.stream(charts, slots, use_container_width=True)
@@ -0,0 +1,58 @@
+import pandas as pd
+import streamlit as st
+
+import tp_cache
+import tp_hist
+import tp_pivot
+import tp_rollup
+
+PERIODS = ["Last 12 Months", "Last 12 Weeks", "Last 30 days"]
+
+
+def build(aggregation_option, today=None):
+    today = pd.Timestamp.today() if today is None else today
+    # Load the daily rollup
+    cube = tp_rollup.get_cube("failure_reasons")
+
+    # 📌 Table 1 : Count of FAILED_REASON by TALKSCORE_CEFR
+    df_counts = tp_rollup.rollup(cube, aggregation_option, today, dims=["FAILED_REASON", "CEFR"])
+    pivot_count = tp_pivot.materialize(df_counts, "FAILED_REASON", ["DATE_GROUP", "CEFR"], "n", fill_value=0,
+                                       labels={"DATE_GROUP": "%b-%d-%Y"})
+
+    # 📌 Table 2 : Average TALKSORES by FAILED_REASON
+    df_stats = tp_rollup.rollup(cube, aggregation_option, today, dims=["FAILED_REASON"])
+    pivot_avg2  = df_stats[["DATE_GROUP", "FAILED_REASON"]].assign(**{c: tp_rollup.mean(df_stats, c) for c in ["VOC", "FLU", "GRAM", "PRON", "OVERALL"]})
+    ## Pivot Monthly Table: one column group per DATE_GROUP, the scores below
+    pvt_avg2 = tp_pivot.materialize(pivot_avg2, "FAILED_REASON", "DATE_GROUP", ["VOC", "FLU", "GRAM", "PRON", "OVERALL"],
+                                    labels={"DATE_GROUP": "%b-%d-%Y"},
+                                    formats={c: "{:.2f}" for c in ["VOC", "FLU", "GRAM", "PRON"]})
+
+    # 📌 Table 3 : Percentiles of TALKSCORES by FAILED_REASON over the whole period
+    hist = tp_rollup.window(tp_hist.get_histogram("failure_scores"), aggregation_option, today)
+    pct = tp_hist.quantiles(hist, ["FAILED_REASON", "measure"], {"P10": 0.1, "Median": 0.5, "P90": 0.9})
+    pvt_pct = tp_pivot.materialize(pct, "FAILED_REASON", "measure", ["P10", "Median", "P90"],
+                                   formats={c: "{:.2f}" for c in ["P10", "Median", "P90"]})
+
+    return {"pivot_count": pivot_count, "pvt_avg2": pvt_avg2, "pvt_pct": pvt_pct}
+
+
+FIGURES = {}
+
+
+def tables(data):
+    return {"Count of FAILED_REASON by TALKSCORE_CEFR": data["pivot_count"],
+            "Average TALKSORES by FAILED_REASON": data["pvt_avg2"],
+            "Percentiles of TALKSCORES by FAILED_REASON": data["pvt_pct"]}
+
+
+def render():
+    st.title("Failure Reasons")
+
+    col = st.columns(3)
+    with col[2]: aggregation_option = st.selectbox("Time Period", PERIODS)
+    _, _, tabs = tp_cache.view(__name__, aggregation_option)
+
+    #Show the tables, one page of rows and columns at a time
+    for title, table in tabs.items():
+        st.subheader(title)
+        tp_pivot.show(table, key=f"{title}:{aggregation_option}")
@@ -0,0 +1,97 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_format
+import tp_rollup
+
+PERIODS = ["Last 12 Months", "Last 12 Weeks", "Last 30 days"]
+# Number formats applied by st.dataframe when the tables are shown
+TABLE_FORMATS = {"REJECT %": "%.2f%%"}
+
+
+def build(aggregation_option, today=None):
+    today = pd.Timestamp.today() if today is None else today
+    # Load the daily rollup
+    actions = tp_rollup.get_cube("folder_actions")
+
+    # Group by month,and weeky
+    df_rej = tp_rollup.rollup(actions, aggregation_option, today)
+    df_rej = df_rej[["DATE_GROUP", "REJECTED_BY_MANAGER__sum", "MOVED_BY_MANAGER__sum"]].rename(
+        columns={"REJECTED_BY_MANAGER__sum": "REJECTED_BY_MANAGER", "MOVED_BY_MANAGER__sum": "MOVED_BY_MANAGER"})
+    # Calculate rejection percentage
+    df_rej['REJECT_PERCENT'] = (df_rej['REJECTED_BY_MANAGER'] / df_rej['MOVED_BY_MANAGER']) * 100
+
+    #FIG 3# Normalize the counts per month to percentages
+    df3_actions = tp_rollup.rollup(actions[actions["MOVED_BY"] == "Manager"], aggregation_option, today, dims=["FOLDER_TO_TITLE"])
+    df3_actions = df3_actions[["DATE_GROUP", "FOLDER_TO_TITLE", "n"]].rename(columns={"n": "COUNT"})
+    df3_actions = tp_charts.fold_tail(df3_actions, "FOLDER_TO_TITLE", "COUNT")
+            # Normalize to get percentage per month
+    df3_actions["PERCENTAGE"] = tp_format.group_share(df3_actions, "DATE_GROUP", "COUNT")
+
+    #TABLE
+    # MOVER_EMAIL is canonicalised at ingest (CLEANED_MOVER_EMAIL), so the
+    # per-manager totals are a groupby over the categorical codes
+    df = tp_rollup.window(tp_rollup.get_cube("folder_movers"), aggregation_option, today)
+    df_mover = df.groupby('CLEANED_MOVER_EMAIL', observed=True)[['REJECTED_BY_MANAGER__sum', 'MOVED_BY_MANAGER__sum']].sum().rename(
+        columns={'REJECTED_BY_MANAGER__sum': 'REJECTED_BY_MANAGER', 'MOVED_BY_MANAGER__sum': 'MOVED_BY_MANAGER'})
+
+    # Calculate rejection percentage
+    df_mover['REJECT_PERCENT'] = (df_mover['REJECTED_BY_MANAGER'] / df_mover['MOVED_BY_MANAGER']) * 100
+    df_mover = df_mover.sort_values(by='REJECTED_BY_MANAGER', ascending=False)
+    df_mover = df_mover.reset_index()
+    df_mover = df_mover.rename(columns={'REJECT_PERCENT': 'REJECT %'})
+
+    return {"df_rej": df_rej, "df3_actions": df3_actions, "df_mover": df_mover}
+
+
+def fig1(data):
+    # creation of the plot
+    fig1 = px.line(data["df_rej"],
+               x="DATE_GROUP",
+               y="REJECT_PERCENT",
+               markers=True,  # Add points (vertices)
+               title="Reject % Over the time",
+               labels={"DATE_GROUP": "Time", "REJECT_PERCENT": "Rejection %"},
+               line_shape="linear",
+               text="REJECT_PERCENT")
+        # Update the trace to display the text on the chart, formatted as a percentage
+    fig1.update_traces(texttemplate="%{text:.2f}%", textposition="top center", fill='tozeroy' , fillcolor="rgba(0, 0, 255, 0.2)")
+    return fig1
+
+
+def fig3(data):
+    #FIG 3
+    fig3 = px.bar(data["df3_actions"],
+    x="DATE_GROUP", y="PERCENTAGE",
+    color="FOLDER_TO_TITLE", text="PERCENTAGE",
+    title="Percentage of actions BY Manager",
+    labels={"DATE_GROUP": "Time", "PERCENTAGE": "Percentage", "FOLDER_TO_TITLE": "Actions"}
+    )
+    fig3.update_traces(texttemplate="%{text:.2f}%")
+    fig3.update_layout(barmode="stack", yaxis=dict(tickformat=".0%"), height=500)
+    return fig3
+
+
+FIGURES = {"fig1": fig1, "fig3": fig3}
+
+
+def tables(data):
+    return {"Rejection % By Manager": data["df_mover"]}
+
+
+def render():
+    st.title("HM actions")
+
+    col = st.columns(3)
+    with col[2]: aggregation_option = st.selectbox("Time Period", PERIODS)
+    _, charts, tabs = tp_cache.view_async(__name__, aggregation_option)
+    slots = {name: st.empty() for name in charts}
+
+    # Show the table
+    for title, table in tabs.items():
+        st.subheader(title)
+        st.dataframe(table, use_container_width=True, column_config=tp_format.column_config(TABLE_FORMATS))
+    tp_charts.stream(charts, slots, use_container_width=True)
@@ -0,0 +1,194 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_format
+import tp_rollup
+
+PERIODS = ["Last 12 Months", "Last 12 Weeks", "Last 30 days"]
+custom_colors = ["#2F76B9", "#3B9790", "#F5BA2E", "#6A4C93", "#F77F00", "#B4BBBE", "#e6657b", "#026df5", "#5aede2"]
+score_columns = ["TALKSCORE_VOCAB", "TALKSCORE_FLUENCY", "TALKSCORE_GRAMMAR", "TALKSCORE_PRONUNCIATION"]
+
+
+def build(aggregation_option, today=None):
+    today = pd.Timestamp.today() if today is None else today
+    # Load the daily rollups and combine them for the selected period
+    sites_cube = tp_rollup.get_cube("tp_raw_sites")
+    df_sites = tp_rollup.rollup(sites_cube, aggregation_option, today)
+    df_scores = tp_rollup.rollup(tp_rollup.get_cube("tp_raw_scores"), aggregation_option, today)  # TALKSCORE_OVERALL > 0
+    score_totals = df_scores.sum(numeric_only=True)
+
+    # Calculate metrics of scorecards, in display order
+    metrics = pd.DataFrame({
+        "Metric": ["Total Average Talkscore Overall", "Total count of  leads", "Total Average Talkscore Vocabulary",
+                   "Total Average Talkscore Fluency", "Total Average Talkscore Grammar",
+                   "Total Average Talkscore Pronunciation"],
+        "Value": [tp_rollup.mean(score_totals, "TALKSCORE_OVERALL"), df_sites["n"].sum(),
+                  tp_rollup.mean(score_totals, "TALKSCORE_VOCAB"), tp_rollup.mean(score_totals, "TALKSCORE_FLUENCY"),
+                  tp_rollup.mean(score_totals, "TALKSCORE_GRAMMAR"),
+                  tp_rollup.mean(score_totals, "TALKSCORE_PRONUNCIATION")],
+        "Format": [",.2f", ",.0f", ",.2f", ",.2f", ",.2f", ",.2f"],
+    })
+
+    # FIG1 Aggregate Data
+    df_avg_overall = pd.DataFrame({"DATE_GROUP": df_scores["DATE_GROUP"], "TALKSCORE_OVERALL": tp_rollup.mean(df_scores, "TALKSCORE_OVERALL")})
+    # FIG2 count of leads
+    df_CountLeads = df_sites[["DATE_GROUP", "n"]].rename(columns={"n": "DATE_DAY"})
+
+    #FIG2 and FIG2w column stacked avg components
+            # Averages per DATE_GROUP
+    group_avg = df_scores[["DATE_GROUP"]].assign(**{c: tp_rollup.mean(df_scores, c) for c in score_columns})
+            # Melt the DataFrame for Plotly
+    df_avg_components = group_avg.melt(id_vars=["DATE_GROUP"],  value_vars=score_columns, var_name="Score Type",  value_name="Average Score")
+
+    #FIG 3 Uncompleted and completed test
+    test_summary = tp_rollup.rollup(sites_cube, aggregation_option, today, dims=["CAMP_SITE"])
+    test_summary = test_summary[["DATE_GROUP", "CAMP_SITE", "TEST_COMPLETED__sum"]].rename(columns={"TEST_COMPLETED__sum": "TEST_COMPLETED"})
+    # Small sites share one "Other" bar so the chart stays bounded as sites are added
+    test_summary = tp_charts.fold_tail(test_summary, "CAMP_SITE", "TEST_COMPLETED")
+
+    # FIG 4 Create calculated fields - calculate percentages
+    total_tests = df_sites[["DATE_GROUP", "TEST_COMPLETED__count"]].rename(columns={"TEST_COMPLETED__count": "TEST_COMPLETED"})
+    test_pct = test_summary.merge(total_tests, on="DATE_GROUP", suffixes=('', '_TOTAL'))
+    test_pct['PERCENTAGE_COMPLETED'] = (test_pct['TEST_COMPLETED'] / test_pct['TEST_COMPLETED_TOTAL']) * 100
+
+    # FIG 5
+    df5_TSreviewM = df_sites[["DATE_GROUP", "FOR_TS_REVIEW__sum"]].rename(columns={"FOR_TS_REVIEW__sum": "FOR_TS_REVIEW"})
+
+    #FIG 6
+    df6_counts = tp_rollup.rollup(tp_rollup.get_cube("tp_raw_sources"), aggregation_option, today, dims=["NEW_SOURCE"])
+    df6_counts = df6_counts[["DATE_GROUP", "NEW_SOURCE", "n"]].rename(columns={"n": "COUNT"})
+    df6_counts = tp_charts.fold_tail(df6_counts, "NEW_SOURCE", "COUNT")
+    df6_counts["PERCENTAGE"] = tp_format.group_share(df6_counts, "DATE_GROUP", "COUNT")
+
+    return {"metrics": metrics, "df_avg_overall": df_avg_overall, "df_CountLeads": df_CountLeads,
+            "df_avg_components": df_avg_components, "test_summary": test_summary, "test_pct": test_pct,
+            "df5_TSreviewM": df5_TSreviewM, "df6_counts": df6_counts}
+
+
+def avg_overall(data):
+    fig = px.line(data["df_avg_overall"], x="DATE_GROUP", y="TALKSCORE_OVERALL", title="Average Talkscore Overall",
+                  labels={"DATE_GROUP": "Time", "TALKSCORE_OVERALL": "Talkscore Overall"},
+                  color_discrete_sequence=["#3B9790"])
+    fig.update_layout(height=300)
+    return fig
+
+
+def lead_counts(data):
+    fig = px.area(data["df_CountLeads"], x="DATE_GROUP", y="DATE_DAY", title="Trend of Lead Counts",
+                  labels={"DATE_GROUP": "Time", "DATE_DAY": "Leads"}, color_discrete_sequence=["#3B9790"])
+    fig.update_layout(height=300)
+    return fig
+
+
+def fig2(data):
+        # FIG 2: Stacked Column (Component Breakdown)
+    fig2 = px.line(data["df_avg_components"],
+        x="DATE_GROUP",     y="Average Score",
+        color="Score Type",  # Different lines for each component
+        markers=True, title="Talkscore Components Month over Month", labels={"DATE_GROUP": "Time", "Average Score": "Score"},
+        line_shape="linear",  text="Average Score" ) # Show values on points
+     # Position text labels on the chart
+    fig2.update_traces(texttemplate="%{text:.2f}", textposition="top center")
+    return fig2
+
+
+def fig3(data):
+    # FIG 3 Create Line Chart
+    fig3 =  px.bar(data["test_summary"],
+        x="DATE_GROUP", y="TEST_COMPLETED",
+        color="CAMP_SITE",  text="TEST_COMPLETED",
+        barmode="group",  title="Test Completion Status",
+        labels={"TEST_COMPLETED": "Total Tests Completed", "DATE_GROUP": "time", "CAMP_SITE": "Camp Site"} ,
+        color_discrete_sequence=custom_colors    )
+        # Format labels (rounded values)
+    fig3.update_traces(textposition="inside")
+    fig3.update_layout(xaxis_title="time", yaxis_title="Total Test Completed", bargap=0.2)
+    return fig3
+
+
+def fig4(data):
+    # FIG 4 Create Line Chart
+    test_pct = data["test_pct"]
+    fig4 = px.line(test_pct,
+        x="DATE_GROUP", y="PERCENTAGE_COMPLETED",
+        color="CAMP_SITE",
+        markers=True,  # Add markers to each data point
+        title="Test Completion Status (%)",
+        labels={"PERCENTAGE_COMPLETED": "Percentage of Tests Completed", "DATE_GROUP": "Time",
+            "CAMP_SITE": "Camp Site"},
+            color_discrete_sequence=custom_colors)
+    # Format y-axis as percentage
+    fig4.update_layout(xaxis_title="Time", yaxis_title="Percentage of Tests Completed", yaxis_ticksuffix="%")
+    # Add data labels (percentage values)
+    fig4.update_traces(text=test_pct['PERCENTAGE_COMPLETED'].round(1),
+        textposition="top center")
+    return fig4
+
+
+def fig5(data):
+    # FIG 5
+    fig5 = px.line(data["df5_TSreviewM"],
+                x="DATE_GROUP", y="FOR_TS_REVIEW", title="For TS Review Monthly"
+                ,markers=True,labels={"DATE_GROUP": "Time", "FOR_TS_REVIEW": "For TS Review"}
+                ,line_shape="linear",text="FOR_TS_REVIEW")
+    fig5.update_traces(textposition="top center")
+    return fig5
+
+
+def fig6(data):
+    #FIG 6
+    df6_counts = data["df6_counts"]
+    fig6 = px.bar(df6_counts,
+        x="DATE_GROUP", y="PERCENTAGE",
+        color="NEW_SOURCE", text="PERCENTAGE",
+        title="100% Stacked Column Chart",
+        labels={"PERCENTAGE": "Percentage", "DATE_GROUP": "time", "NEW_SOURCE": "Source"} ,
+         color_discrete_sequence=custom_colors )
+    fig6.update_traces(texttemplate="%{text:.1f}%")
+    fig6.update_layout(barmode="stack", yaxis=dict(tickformat=".0%"), height=500)
+    return fig6
+
+
+# Chart builders in display order; each one only reads `data`, so they can run concurrently
+FIGURES = {"avg_overall": avg_overall, "lead_counts": lead_counts,
+           "fig2": fig2, "fig3": fig3, "fig4": fig4, "fig5": fig5, "fig6": fig6}
+
+
+def tables(data):
+    return {"Scorecards": data["metrics"][["Metric", "Value"]]}
+
+
+def render():
+    st.title("Overview data")
+
+    # bar dropdown
+    col = st.columns(3)
+    with col[2]: aggregation_option = st.selectbox("Time Period", PERIODS)
+    data, charts, _ = tp_cache.view_async(__name__, aggregation_option)
+    metrics = data["metrics"]
+    slots = {}
+
+    def metric(row):
+        st.metric(label=row.Metric, value=format(row.Value, row.Format))
+
+    Cols_b = st.columns(2)
+    for col, row in zip(Cols_b, metrics.iloc[:2].itertuples()):
+        with col:
+            metric(row)
+
+    cols = st.columns(2)
+    for col, name in zip(cols, ["avg_overall", "lead_counts"]):
+        with col:
+            slots[name] = st.empty()
+
+    Cols_c = st.columns(4)
+    for col, row in zip(Cols_c, metrics.iloc[2:].itertuples()):
+        with col:
+            metric(row)
+
+    # Display Charts, each as soon as it is built
+    slots.update({name: st.empty() for name in charts if name not in slots})
+    tp_charts.stream(charts, slots)
@@ -0,0 +1,87 @@
+import pandas as pd
+import plotly.express as px
+import plotly.figure_factory as ff
+import streamlit as st
+
+import tp_cache
+import tp_charts
+import tp_loaders
+import tp_moments
+import tp_sql
+
+# Dropdown options
+options = {"Last 30 days": 30, "Last 12 Weeks": 84, "Last 1 Year": 365, "All Time": None}
+PERIODS = list(options.keys())
+# Define colors
+colors = ["#001E44", "#F5F5F5", "#E53855", "#B4BBBE", "#2F76B9", "#3B9790", "#F5BA2E", "#6A4C93", "#F77F00"]
+talkscore_vars = ['TALKSCORE_VOCAB', 'TALKSCORE_FLUENCY', 'TALKSCORE_GRAMMAR',
+                  'TALKSCORE_COMPREHENSION', 'TALKSCORE_PRONUNCIATION', 'TALKSCORE_OVERALL']
+
+
+def build(selection, today=None):
+    today = pd.Timestamp.today() if today is None else today
+    start_date = today - pd.Timedelta(days=options[selection]) if options[selection] else None
+    data = {"rejection_counts": None, "corr_matrix": None}
+    if tp_sql.ENABLED:
+        # aggregated by DuckDB over the store rows with TALKSCORE_OVERALL > 0
+        available = tp_sql.columns("talkscore")
+        if 'REJECTED_REASON' in available:
+            data["rejection_counts"] = tp_sql.top_counts("talkscore", 'REJECTED_REASON', 5, start_date, "TALKSCORE_OVERALL > 0")
+        if all(var in available for var in talkscore_vars):
+            data["corr_matrix"] = tp_sql.corr("talkscore", talkscore_vars, start_date, "TALKSCORE_OVERALL > 0").round(2)
+        return data
+
+    # Load data for the selected period only (the window is pushed down to the month partitions)
+    TPSC1 = tp_loaders.get_dataset("talkscore", since=start_date)
+    filtered_df = TPSC1[TPSC1['TALKSCORE_OVERALL'] > 0]
+
+    if 'REJECTED_REASON' in filtered_df.columns:
+        data["rejection_counts"] = filtered_df['REJECTED_REASON'].value_counts().nlargest(5)
+    if all(var in filtered_df.columns for var in talkscore_vars):
+        # combined from the per-day co-moments rather than a pass over every row
+        data["corr_matrix"] = tp_moments.corr("talkscore", talkscore_vars, start_date).round(2)
+    return data
+
+
+def fig1(data):
+    # Graph 1: Top 5 Rejection Reasons
+    rejection_counts = data["rejection_counts"]
+    if rejection_counts is None:
+        return None
+    return px.bar(x=rejection_counts.index, y=rejection_counts.values,
+                  labels={'x': 'Rejection Reason', 'y': 'Count'}, color=rejection_counts.index,
+                  color_discrete_sequence=colors[:5])
+
+
+def fig2(data):
+    # Graph 2: Correlation Heatmap of Talkscore Variables
+    corr_matrix = data["corr_matrix"]
+    if corr_matrix is None:
+        return None
+    return ff.create_annotated_heatmap(z=corr_matrix.values, x=talkscore_vars, y=talkscore_vars,
+                                       annotation_text=corr_matrix.round(2).astype(str).values,
+                                       colorscale='Blues', showscale=True)
+
+
+FIGURES = {"fig1": fig1, "fig2": fig2}
+# Shown in place of a chart whose columns the export lacks
+MISSING = {"fig1": "No rejection reasons available in the dataset.",
+           "fig2": "Talkscore variables not available in the dataset."}
+
+
+def tables(data):
+    return {}
+
+
+def render():
+    st.title("Talkscore Analysis")
+    selection = st.selectbox("Select Time Period", PERIODS)
+    _, charts, _ = tp_cache.view_async(__name__, selection)
+
+    slots = {}
+    st.subheader("Top 5 Rejection Reasons")
+    slots["fig1"] = st.empty()
+
+    st.subheader("Correlation Heatmap of Talkscore Variables")
+    slots["fig2"] = st.empty()
+    tp_charts.stream(charts, slots, missing=MISSING)
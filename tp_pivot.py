@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import tp_data
+import tp_format
+
+# Wide page tables (reason x period x CEFR and the like) are kept in long form
+# and only the slice on screen is pivoted and sent to the browser. `Pivot`s
+# live in the cached page views, so they are materialized once per data
+# version and shared by every session; the paging state is per session.
+
+# Rows per page and value columns per column window when a pivot is shown
+TABLE_ROWS = int(os.environ.get("TP_TABLE_ROWS", 25))
+TABLE_COLUMNS = int(os.environ.get("TP_TABLE_COLUMNS", 24))
+
+
+def _keys(frame, cols):
+    """Sorted distinct keys of `cols` and each row's position among them."""
+    groups = frame.groupby(cols, observed=True, sort=True, dropna=False)
+    return groups.size().index, groups.ngroup().to_numpy(np.int32)
+
+
+def _relabel(keys, labels):
+    """`keys` with the levels in `labels` (level -> strftime format) turned into strings, once per value."""
+    if isinstance(keys, pd.MultiIndex):
+        for name, fmt in labels.items():
+            level = keys.names.index(name)
+            keys = keys.set_levels(keys.levels[level].strftime(fmt), level=level, verify_integrity=False)
+        return keys
+    return keys.strftime(labels[keys.name]) if keys.name in labels else keys
+
+
+class Pivot:
+    """A pivot table held as its non-empty cells, pivoted on demand.
+
+    `rows` and `groups` are the sorted row and column keys (an Index or
+    MultiIndex); each group spans one column per name in `values`. `cells`
+    holds the row and group position of every present cell with its values;
+    absent cells show as `fill_value`. `formats` maps a value name to the
+    format its present cells get (see `tp_format.format_numbers`), applied
+    only to the slice being drawn so sorting still sees the numbers.
+    """
+
+    def __init__(self, rows, groups, values, cells, fill_value=np.nan, formats=None):
+        self.rows, self.groups, self.values = rows, groups, list(values)
+        self.cells = cells
+        self.fill_value = fill_value
+        self.formats = formats or {}
+
+    @property
+    def shape(self):
+        """(rows, column groups)."""
+        return len(self.rows), len(self.groups)
+
+    def memory_usage(self):
+        return int(self.cells.memory_usage(deep=True).sum() + self.rows.memory_usage(deep=True)
+                   + self.groups.memory_usage(deep=True))
+
+    def column(self, position):
+        """Label of the `position`-th value column, as it appears in `frame`."""
+        group, value = divmod(position, len(self.values))
+        key = self.groups[group]
+        key = key if isinstance(key, tuple) else (key,)
+        return (*key, self.values[value]) if len(self.values) > 1 else key if len(key) > 1 else key[0]
+
+    def order(self, by=None, ascending=True):
+        """Row positions sorted by the value column at position `by` (None: by row key); missing last."""
+        if by is None:
+            positions = np.arange(len(self.rows))
+            return positions if ascending else positions[::-1]
+        group, value = divmod(by, len(self.values))
+        cells = self.cells[self.cells["group"] == group]
+        key = pd.Series(self.fill_value, index=range(len(self.rows)), dtype=np.float64)
+        key.iloc[cells["row"].to_numpy()] = cells[self.values[value]].to_numpy(dtype=np.float64)
+        return key.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+
+    def frame(self, rows=None, groups=None, formatted=True):
+        """The wide table for row positions `rows` and group positions `groups` (default all), in that order.
+
+        With `formatted` False the cells keep their numbers instead of the `formats` labels.
+        """
+        rows = np.arange(len(self.rows)) if rows is None else np.asarray(rows)
+        groups = np.arange(len(self.groups)) if groups is None else np.asarray(groups)
+        row_at = np.full(len(self.rows), -1)
+        row_at[rows] = np.arange(len(rows))
+        group_at = np.full(len(self.groups), -1)
+        group_at[groups] = np.arange(len(groups))
+        r = row_at[self.cells["row"].to_numpy()]
+        g = group_at[self.cells["group"].to_numpy()]
+        shown = (r >= 0) & (g >= 0)
+        blocks = []
+        for name in self.values:
+            values = self.cells[name].to_numpy()[shown]
+            if values.dtype == np.float32:
+                # upcast like the stored decimals, not as 6.599999904632568
+                values = tp_data.widen(pd.Series(values)).to_numpy()
+            if formatted and name in self.formats:
+                values = tp_format.format_numbers(pd.Series(values), self.formats[name]).to_numpy()
+            block = np.full((len(rows), len(groups)), self.fill_value,
+                            dtype=np.result_type(values.dtype, np.asarray(self.fill_value).dtype))
+            block[r[shown], g[shown]] = values
+            blocks.append(block)
+        out = pd.DataFrame({i * len(blocks) + v: block[:, i] for i in range(len(groups))
+                            for v, block in enumerate(blocks)}, index=self.rows[rows])
+        labels = [self.column(pos * len(blocks) + v) for pos in groups for v in range(len(blocks))]
+        if len(self.values) > 1 or isinstance(self.groups, pd.MultiIndex):
+            names = [*self.groups.names, None] if len(self.values) > 1 else self.groups.names
+            out.columns = pd.MultiIndex.from_tuples(labels, names=names) if labels \
+                else pd.MultiIndex.from_arrays([[]] * len(names), names=names)
+        else:
+            out.columns = pd.Index(labels, name=self.groups.name)
+        return out
+
+
+def materialize(long, index, columns, values, fill_value=np.nan, labels=None, formats=None):
+    """Pivot of `long` (at most one row per `index` x `columns` key) with `values` under each column key.
+
+    Row and column keys are sorted on their own values (so periods sort by
+    date), and `labels` (column -> strftime format) renames a key level once
+    per distinct value.
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    values = [values] if isinstance(values, str) else list(values)
+    rows, row_codes = _keys(long, index)
+    groups, group_codes = _keys(long, columns)
+    cells = pd.DataFrame({"row": row_codes, "group": group_codes,
+                          **{name: long[name].to_numpy() for name in values}})
+    return Pivot(rows, _relabel(groups, labels or {}), values, cells, fill_value, formats)
+
+
+def _label(pivot, position):
+    if position is None:
+        return "Row"
+    label = pivot.column(position)
+    return " / ".join(map(str, label)) if isinstance(label, tuple) else str(label)
+
+
+def show(pivot, key):
+    """Draw the visible slice of `pivot`, with sort, row paging and column window controls.
+
+    `key` identifies the table's widgets within the page; settings a new data
+    version no longer has (a column or page past the end) are reset.
+    """
+    import streamlit as st
+
+    n_rows, n_groups = pivot.shape
+    per_window = max(TABLE_COLUMNS // len(pivot.values), 1)
+    row_pages = max(-(-n_rows // TABLE_ROWS), 1)
+    windows = max(-(-n_groups // per_window), 1)
+    options = [None, *range(n_groups * len(pivot.values))]
+    for name, valid in [("sort", lambda v: v in options), ("page", lambda v: 1 <= v <= row_pages),
+                        ("window", lambda v: 1 <= v <= windows)]:
+        if f"{key}:{name}" in st.session_state and not valid(st.session_state[f"{key}:{name}"]):
+            del st.session_state[f"{key}:{name}"]
+
+    controls = st.columns(4)
+    with controls[0]:
+        by = st.selectbox("Sort by", options, key=f"{key}:sort", format_func=lambda pos: _label(pivot, pos))
+    with controls[1]:
+        descending = st.checkbox("Descending", key=f"{key}:desc")
+    with controls[2]:
+        page = st.number_input(f"Rows page (of {row_pages})", 1, row_pages, key=f"{key}:page") \
+            if row_pages > 1 else 1
+    with controls[3]:
+        window = st.number_input(f"Columns page (of {windows})", 1, windows, key=f"{key}:window") \
+            if windows > 1 else 1
+
+    rows = pivot.order(by, ascending=not descending)[(page - 1) * TABLE_ROWS:page * TABLE_ROWS]
+    groups = np.arange((window - 1) * per_window, min(window * per_window, n_groups))
+    st.dataframe(pivot.frame(rows, groups), use_container_width=True)
+    if len(rows) and len(groups) and (row_pages > 1 or windows > 1):
+        first = (page - 1) * TABLE_ROWS
+        unit = "columns" if len(pivot.values) == 1 else "column groups"
+        st.caption(f"Rows {first + 1}–{first + len(rows)} of {n_rows}, "
+                   f"{unit} {groups[0] + 1}–{groups[-1] + 1} of {n_groups}")
@@ -0,0 +1,69 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Worker threads shared by dataset ingests, cube builds and chart building.
+# Parquet reads, the CSV parser and most of the pandas groupby kernels release
+# the GIL, so these overlap; with 1 everything runs inline on the caller.
+WORKERS = int(os.environ.get("TP_WORKERS", min(4, os.cpu_count() or 1)))
+
+_executor = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _mark_worker():
+    _local.worker = True
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(WORKERS, thread_name_prefix="tp-worker", initializer=_mark_worker)
+    return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` on the pool and return its Future.
+
+    Runs inline (returning a finished Future) with a single worker, and when
+    called from a pool thread, so a task fanning out again never waits on a
+    pool it is occupying. The task runs in a copy of the caller's context, so
+    e.g. its ``tp_profile`` stages are recorded in the caller's rerun.
+    """
+    if WORKERS <= 1 or getattr(_local, "worker", False):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    return _pool().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def gather(fn, items):
+    """``[fn(item) for item in items]``, run concurrently; the first error is re-raised."""
+    futures = [submit(fn, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def when_all(futures, callback):
+    """Call ``callback()`` once every future is done, on the thread finishing the last one."""
+    futures = list(futures)
+    if not futures:
+        callback()
+        return
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(done)
@@ -0,0 +1,167 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+import tp_cache
+import tp_data
+import tp_hist
+import tp_pages
+import tp_pool
+import tp_rollup
+import tp_topn
+
+log = logging.getLogger(__name__)
+
+# Set TP_PREWARM=0 to build views on first request only
+ENABLED = os.environ.get("TP_PREWARM", "1") != "0"
+# Seconds between checks of the data folder for new exports
+INTERVAL = float(os.environ.get("TP_PREWARM_INTERVAL", 30))
+
+
+def _attempt(fn, name):
+    """(`fn(name)`, None), or (None, the exception it raised), which is logged."""
+    try:
+        return fn(name), None
+    except Exception as exc:
+        log.warning("prewarm: %s(%r) failed: %r", fn.__name__, name, exc)
+        return None, exc
+
+
+def ingest_all(names=None):
+    """Ingest the exports `names` (default all) and build the daily summaries pages read on them.
+
+    The exports are independent, so they are ingested concurrently, and then
+    their daily cubes, counters and histograms are built concurrently.
+    Returns ({dataset: version}, {dataset or summary: exception}): an export
+    that is missing or fails to ingest is left out, with the summaries over
+    it, without failing the others.
+    """
+    names = list(tp_data.DATASETS) if names is None else list(names)
+    versions, errors = {}, {}
+    for name, (version, exc) in zip(names, tp_pool.gather(lambda name: _attempt(tp_data.refresh, name), names)):
+        if exc is None:
+            versions[name] = version
+        else:
+            errors[name] = exc
+    jobs = [(tp_rollup.get_cube, name) for name, spec in tp_rollup.CUBES.items() if spec["dataset"] in versions]
+    jobs += [(tp_topn.get_counters, name) for name in tp_topn.COUNTERS if name in versions]
+    jobs += [(tp_hist.get_histogram, name) for name, spec in tp_hist.HISTOGRAMS.items() if spec["dataset"] in versions]
+    for (_, name), (_, exc) in zip(jobs, tp_pool.gather(lambda job: _attempt(*job), jobs)):
+        if exc is not None:
+            errors[name] = exc
+    return versions, errors
+
+
+class Prewarmer(threading.Thread):
+    """Background thread that rebuilds every page view when an export lands.
+
+    It polls the exports' mtime/size (and the date, since windows are
+    relative to today). On a change it ingests the new exports, builds all
+    pages x periods into the view cache for the new dataset versions and then
+    publishes them in one step; until then sessions keep being served the
+    previous, complete set of views. An export that fails to ingest is left
+    out of what is published, so only the pages reading it are served from
+    the live store (where its error shows); it is retried once it changes.
+    """
+
+    def __init__(self, interval=INTERVAL):
+        super().__init__(name="tp-prewarm", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._signature = None
+        self.status = {"runs": 0, "last_run": None, "last_seconds": None, "last_error": None}
+
+    def signature(self):
+        files = []
+        for name in tp_data.DATASETS:
+            try:
+                st_ = os.stat(tp_data.csv_path(name))
+                files.append((name, st_.st_mtime_ns, st_.st_size))
+            except OSError:
+                files.append((name, None, None))
+        return pd.Timestamp.today().date(), tuple(files)
+
+    def warm_all(self):
+        """Ingest, warm every page whose exports ingested and publish; returns {what: exception} of what failed."""
+        day = pd.Timestamp.today().date()
+        versions, errors = ingest_all()
+        for title in tp_pages.titles():
+            page = tp_pages.PAGES[title]
+            if not all(name in versions for name in page["datasets"]):
+                continue
+            try:
+                for period in importlib.import_module(page["module"]).PERIODS:
+                    tp_cache.warm(page["module"], period, day, versions)
+            except Exception as exc:  # built on request instead
+                log.warning("prewarm: page %s failed: %r", title, exc)
+                errors[title] = exc
+        tp_cache.publish(day, versions)
+        return errors
+
+    def run(self):
+        while not self._stop_event.is_set():
+            signature = self.signature()
+            if signature != self._signature:
+                start = time.perf_counter()
+                try:
+                    errors = self.warm_all()
+                    self._signature = signature
+                    self.status["last_error"] = "; ".join(f"{name}: {exc!r}" for name, exc in errors.items()) or None
+                except Exception as exc:  # keep serving the last published views
+                    log.exception("prewarm failed")
+                    self.status["last_error"] = repr(exc)
+                self.status.update(runs=self.status["runs"] + 1, last_run=time.time(),
+                                   last_seconds=round(time.perf_counter() - start, 2))
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+
+    def wake(self):
+        """Check the exports now instead of at the next interval."""
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+_worker = None
+_lock = threading.Lock()
+
+
+def start():
+    """Start the process-wide prewarmer once (every rerun may call this)."""
+    global _worker
+    if not ENABLED:
+        return None
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = Prewarmer()
+            _worker.start()
+    return _worker
+
+
+def wake():
+    """Have the prewarmer pick up a new export now (e.g. right after tp_fetch installed it)."""
+    worker = _worker
+    if worker is not None:
+        worker.wake()
+
+
+def stop():
+    """Stop the prewarmer and serve views from the live store again."""
+    global _worker
+    with _lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
+    tp_cache.publish(None, None)
+
+
+def status():
+    worker = _worker
+    return None if worker is None else dict(worker.status, alive=worker.is_alive())
@@ -0,0 +1,157 @@
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Set TP_PROFILE=0 to turn stage timing off
+ENABLED = os.environ.get("TP_PROFILE", "1") != "0"
+# Reruns kept in memory for the admin page
+KEEP_RERUNS = int(os.environ.get("TP_PROFILE_KEEP", 500))
+# When set, every rerun is also appended to this file as one JSON line
+LOG_PATH = os.environ.get("TP_PROFILE_LOG")
+
+log = logging.getLogger(__name__)
+if LOG_PATH:
+    _handler = logging.FileHandler(LOG_PATH)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(logging.INFO)
+
+_current = contextvars.ContextVar("tp_profile_rerun", default=None)
+_reruns = deque(maxlen=KEEP_RERUNS)
+_sessions = {}  # session id -> {"reruns", "wall_ms", "last"}
+_lock = threading.Lock()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_mb():
+    """Resident memory of the process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _delta(after, before):
+    return None if after is None or before is None else round(after - before, 2)
+
+
+class _Rerun:
+    """Stages of one rerun. Pool tasks submitted from it run in a copy of its
+    context and time their stages on their own threads, so each thread keeps
+    its own stack and the totals are merged under a lock. A stage that waited
+    on pool tasks still counts that wait as its own time.
+    """
+
+    def __init__(self, session, page):
+        self.record = {"ts": time.time(), "session": session, "page": page}
+        self.stages = {}  # stage -> {"calls", "ms", "self_ms", "mem_mb"}
+        self.stacks = {}  # thread id -> [[stage, start, child_ms, rss]]
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def push(self, stage):
+        self.stacks.setdefault(threading.get_ident(), []).append([stage, time.perf_counter(), 0.0, _rss_mb()])
+
+    def pop(self):
+        stack = self.stacks[threading.get_ident()]
+        stage, start, child_ms, rss = stack.pop()
+        ms = (time.perf_counter() - start) * 1000
+        if stack:
+            stack[-1][2] += ms
+        mem = _delta(_rss_mb(), rss) or 0.0
+        with self.lock:
+            # a pool task still running after its rerun ended is not recorded
+            if self.closed:
+                return
+            entry = self.stages.setdefault(stage, {"calls": 0, "ms": 0.0, "self_ms": 0.0, "mem_mb": 0.0})
+            entry["calls"] += 1
+            entry["ms"] += ms
+            entry["self_ms"] += ms - child_ms
+            entry["mem_mb"] += mem
+
+    def close(self):
+        """Stop recording; returns the rounded stage totals."""
+        with self.lock:
+            self.closed = True
+            return {name: {k: round(v, 2) for k, v in s.items()} for name, s in self.stages.items()}
+
+
+@contextlib.contextmanager
+def rerun(session, page):
+    """Profile one script rerun of `session` showing `page`; stages inside it are recorded."""
+    if not ENABLED:
+        yield
+        return
+    current = _Rerun(session, page)
+    token = _current.set(current)
+    rss = _rss_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        record = current.record
+        record["wall_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        record["mem_mb"] = _delta(_rss_mb(), rss)
+        record["stages"] = current.close()
+        with _lock:
+            _reruns.append(record)
+            session_stats = _sessions.setdefault(session, {"reruns": 0, "wall_ms": 0.0, "last": None})
+            session_stats["reruns"] += 1
+            session_stats["wall_ms"] += record["wall_ms"]
+            session_stats["last"] = record["ts"]
+        log.info(json.dumps(record, default=str))
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time a block as stage `name` of the current rerun (a no-op outside one)."""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    current.push(name)
+    try:
+        yield
+    finally:
+        current.pop()
+
+
+def timed(name):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def annotate(**fields):
+    """Attach fields (e.g. the selected period) to the current rerun's record."""
+    current = _current.get()
+    if current is not None:
+        current.record.update(fields)
+
+
+def reruns():
+    with _lock:
+        return list(_reruns)
+
+
+def sessions():
+    with _lock:
+        return {sid: dict(s) for sid, s in _sessions.items()}
+
+
+def export_jsonl():
+    """The kept rerun records as JSON lines, the same format as the TP_PROFILE_LOG file."""
+    return "".join(json.dumps(r, default=str) + "\n" for r in reruns())
@@ -0,0 +1,175 @@
+import threading
+
+import pandas as pd
+
+import tp_data
+import tp_loaders
+import tp_profile
+import tp_shared
+import tp_sql
+
+# Daily cubes built from the shared datasets. Each row is one day x one
+# combination of `dims` and holds the row count `n` plus, per measure,
+# count/sum/sumsq/min/max, so any period view can be rolled up from it.
+# `where` filters the rows first; `where_sql` is the same filter for the
+# DuckDB backend.
+CUBES = {
+    "tp_raw_sites": {
+        "dataset": "tp_raw",
+        "dims": ["CAMP_SITE"],
+        "measures": ["TEST_COMPLETED", "FOR_TS_REVIEW"],
+    },
+    "tp_raw_sources": {
+        "dataset": "tp_raw",
+        "dims": ["NEW_SOURCE"],
+        "measures": [],
+    },
+    "tp_raw_scores": {
+        "dataset": "tp_raw",
+        "dims": ["TALKSCORE_CEFR"],
+        "measures": ["TALKSCORE_OVERALL", "TALKSCORE_VOCAB", "TALKSCORE_FLUENCY", "TALKSCORE_GRAMMAR",
+                     "TALKSCORE_PRONUNCIATION"],
+        "where": lambda df: df["TALKSCORE_OVERALL"] > 0,
+        "where_sql": "TALKSCORE_OVERALL > 0",
+    },
+    "failure_reasons": {
+        "dataset": "failure_reasons",
+        "dims": ["FAILED_REASON", "CEFR"],
+        "measures": ["VOC", "FLU", "GRAM", "PRON", "OVERALL"],
+    },
+    "folder_actions": {
+        "dataset": "folder_logs",
+        "dims": ["MOVED_BY", "FOLDER_TO_TITLE"],
+        "measures": ["REJECTED_BY_MANAGER", "MOVED_BY_MANAGER"],
+    },
+    "folder_movers": {
+        "dataset": "folder_logs",
+        "dims": ["CLEANED_MOVER_EMAIL"],
+        "measures": ["REJECTED_BY_MANAGER", "MOVED_BY_MANAGER"],
+    },
+}
+
+# How each statistic combines when days are rolled up into a period
+_STAT_AGG = {"n": "sum", "count": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max"}
+
+
+def build_daily_cube(df, date_col, dims=(), measures=(), where=None):
+    if where is not None:
+        df = df[where(df)]
+    df = df[df[date_col].notna()]
+    work = pd.DataFrame({"DAY": df[date_col].dt.normalize()})
+    aggs = {"n": ("DAY", "size")}
+    for d in dims:
+        work[d] = df[d]
+    for m in measures:
+        work[m] = df[m]
+        # measures are stored narrow (float32/int8); every statistic is taken on
+        # the widened values, so a stored 6.6 is 6.6 in sums and min/max alike
+        work[f"{m}__wide"] = tp_data.widen(df[m])
+        work[f"{m}__sq"] = work[f"{m}__wide"].astype("float64") ** 2
+        aggs[f"{m}__count"] = (m, "count")
+        aggs[f"{m}__sum"] = (f"{m}__wide", "sum")
+        aggs[f"{m}__sumsq"] = (f"{m}__sq", "sum")
+        aggs[f"{m}__min"] = (f"{m}__wide", "min")
+        aggs[f"{m}__max"] = (f"{m}__wide", "max")
+    # dropna=False keeps rows with a missing dim so per-day totals stay exact
+    return work.groupby(["DAY", *dims], observed=True, dropna=False).agg(**aggs).reset_index()
+
+
+def merge_cubes(cube, delta, dims=()):
+    """Add the daily rows of `delta` into `cube`; only days present in `delta` are regrouped."""
+    if not len(delta):
+        return cube
+    touched = cube["DAY"] >= delta["DAY"].min()
+    stats = [c for c in cube.columns if c == "n" or "__" in c]
+    aggs = {c: _STAT_AGG[c.rpartition("__")[2]] for c in stats}
+    merged = tp_data.concat_frames([cube[touched], delta]).groupby(["DAY", *dims], observed=True, dropna=False).agg(aggs)
+    return tp_data.concat_frames([cube[~touched], merged.reset_index()])
+
+
+def date_group(days, aggregation_option):
+    if aggregation_option == "Last 12 Months":
+        return days.dt.to_period('M').dt.to_timestamp()
+    if aggregation_option == "Last 12 Weeks":
+        return days + pd.to_timedelta(6 - days.dt.weekday, unit="D")
+    return days
+
+
+def window(cube, aggregation_option, today):
+    """Cube rows inside the selected period, tagged with their DATE_GROUP."""
+    if aggregation_option == "Last 30 days":
+        cube = cube[cube["DAY"] >= today - pd.Timedelta(days=30)]
+    elif aggregation_option == "Last 12 Weeks":
+        cube = cube[cube["DAY"] >= today - pd.Timedelta(weeks=12)]
+    # bucket each distinct day once, then map back onto the cube rows
+    days = pd.Series(cube["DAY"].unique())
+    groups = pd.Series(date_group(days, aggregation_option).values, index=days.values)
+    return cube.assign(DATE_GROUP=cube["DAY"].map(groups))
+
+
+@tp_profile.timed("rollup")
+def rollup(cube, aggregation_option, today, dims=()):
+    """Combine the daily rows of `cube` per DATE_GROUP (and `dims`)."""
+    w = window(cube, aggregation_option, today)
+    stats = [c for c in cube.columns if c == "n" or "__" in c]
+    aggs = {c: _STAT_AGG[c.rpartition("__")[2]] for c in stats}
+    return w.groupby(["DATE_GROUP", *dims], observed=True).agg(aggs).reset_index()
+
+
+def mean(stats, measure):
+    """Mean of `measure` from rolled-up stats (works on a frame or a totals Series)."""
+    return stats[f"{measure}__sum"] / stats[f"{measure}__count"]
+
+
+_cubes = {}  # name -> (dataset version, cube)
+_lock = threading.Lock()
+_counts = {"hits": 0, "misses": 0}
+
+
+@tp_profile.timed("cube")
+def get_cube(name):
+    """Daily cube for the current version of its dataset, built once per refresh (across processes, see `tp_shared`)."""
+    spec = CUBES[name]
+    version = tp_data.refresh(spec["dataset"])
+    with _lock:
+        cached = _cubes.get(name)
+        _counts["hits" if cached is not None and cached[0] == version else "misses"] += 1
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    date_col = tp_data.DATASETS[spec["dataset"]]["date"]
+    changes = tp_data.changes_since(spec["dataset"], cached[0]) if cached else None
+    if changes is not None:
+        # incremental ingest: drop the replaced days and fold in the new rows only
+        cube = cached[1]
+        for cutoff, rows in changes:
+            if cutoff is not None:
+                cube = cube[cube["DAY"] < cutoff]
+            if rows is not None:
+                delta = build_daily_cube(rows, date_col, spec["dims"], spec["measures"], spec.get("where"))
+                cube = merge_cubes(cube, delta, spec["dims"])
+        tp_shared.put(f"cube:{name}:{version}", cube)
+    else:
+        shared = f"cube:{name}:{version}"
+        cube, held = tp_shared.claim(shared)
+        if cube is None:
+            try:
+                if tp_sql.ENABLED:
+                    # the cube is queried from the store, so the dataset is never loaded into memory
+                    cube = tp_sql.daily_cube(spec["dataset"], spec["dims"], spec["measures"], spec.get("where_sql"))
+                else:
+                    df = tp_loaders.get_dataset(spec["dataset"])
+                    # a newer export may have landed since the refresh above
+                    version = tp_loaders.REGISTRY.version(spec["dataset"])
+                    cube = build_daily_cube(df, date_col, spec["dims"], spec["measures"], spec.get("where"))
+                tp_shared.put(f"cube:{name}:{version}", cube)
+            finally:
+                if held:
+                    tp_shared.release(shared)
+    with _lock:
+        _cubes[name] = (version, cube)
+    return cube
+
+
+def stats():
+    with _lock:
+        return dict(_counts, entries=len(_cubes))
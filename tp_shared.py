@@ -0,0 +1,435 @@
+"""Cache shared by every worker process, behind the in-process caches.
+
+    TP_CACHE_BACKEND=disk   (default) SQLite file in the store folder
+    TP_CACHE_BACKEND=redis  TP_CACHE_URL=redis://host:6379/0, any Redis-compatible server
+    TP_CACHE_BACKEND=none   in-process caches only
+    python tp_shared.py stub --port 6390      local Redis stand-in, for testing
+
+Replicas behind a load balancer (or a restarted one) find the daily cubes,
+per-day summaries and page views another process already built, keyed by
+the app's code, the dataset versions (and page, period, day), instead of
+each computing its own. `claim` makes one process build an entry while the
+others wait for it. A failing backend only costs the cache: the caller
+builds the value itself. Values are pickled, so the cache must only be
+reachable by the dashboard.
+"""
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+
+import tp_data
+
+log = logging.getLogger(__name__)
+
+BACKEND = os.environ.get("TP_CACHE_BACKEND", "disk")
+URL = os.environ.get("TP_CACHE_URL", "redis://127.0.0.1:6379/0")
+# Disk budget of the SQLite cache; least recently used entries are evicted past it
+CACHE_MB = int(os.environ.get("TP_CACHE_MB", 1024))
+# Seconds an entry is kept; keys carry the data versions, so this only bounds garbage
+TTL = int(os.environ.get("TP_CACHE_TTL", 7 * 86400))
+# Longest a process waits for another one building the same entry before building it itself
+LOCK_SECONDS = float(os.environ.get("TP_CACHE_LOCK_SECONDS", 60))
+
+_POLL = 0.1
+# A hit refreshes an entry's last use (for LRU eviction) at most this often, so reads rarely write
+_TOUCH_SECONDS = 60
+
+
+def _release():
+    """Hash of the app's code, so entries built by another release of it are never read."""
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(here, "tp_*.py")) + glob.glob(os.path.join(here, "tp_pages", "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+RELEASE = _release()
+
+
+class DiskCache:
+    """Entries in one SQLite file (WAL, memory-mapped reads) that every process on the host can open."""
+
+    def __init__(self, path, max_bytes=CACHE_MB << 20, ttl=TTL):
+        self.path, self.max_bytes, self.ttl = path, max_bytes, ttl
+        self._local = threading.local()
+        self.hits = self.misses = 0
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={self.max_bytes}")
+            db.execute("CREATE TABLE IF NOT EXISTS entries "
+                       "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires REAL, used REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires REAL)")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        now = time.time()
+        db = self._db()
+        row = db.execute("SELECT value, used FROM entries WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if now - row[1] > _TOUCH_SECONDS:
+            db.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (key, blob, len(blob), now + self.ttl, now))
+            db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            for old, size in db.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (old,))
+                total -= size
+
+    def acquire(self, key, seconds):
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM locks WHERE key = ? AND expires <= ?", (key, now))
+            return db.execute("INSERT OR IGNORE INTO locks VALUES (?, ?)", (key, now + seconds)).rowcount == 1
+
+    def release(self, key):
+        self._db().execute("DELETE FROM locks WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._db() as db:
+            db.execute("DELETE FROM entries")
+            db.execute("DELETE FROM locks")
+
+    def stats(self):
+        entries, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size,
+                "max_bytes": self.max_bytes}
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache:
+    """Entries in a Redis-compatible server, over a small RESP client (one connection per thread).
+
+    Entries expire after `ttl`; the server's own memory policy does the eviction.
+    """
+
+    def __init__(self, url=URL, ttl=TTL, timeout=10):
+        parts = urllib.parse.urlsplit(url)
+        self.host, self.port = parts.hostname or "127.0.0.1", parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.strip("/") or 0)
+        self.ttl, self.timeout = ttl, timeout
+        self._local = threading.local()
+        self.hits = self.misses = 0
+
+    def _connect(self):
+        self._disconnect()
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock, self._local.reader = sock, sock.makefile("rb")
+        try:
+            if self.password:
+                self._send("AUTH", self.password)
+            if self.db:
+                self._send("SELECT", self.db)
+        except BaseException:
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            self._local.reader.close()
+            sock.close()
+        self._local.sock = self._local.reader = None
+
+    def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts += [f"${len(data)}\r\n".encode(), data, b"\r\n"]
+        self._local.sock.sendall(b"".join(parts))
+        return self._reply()
+
+    def _reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by the cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else self._local.reader.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._reply() for _ in range(size)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    def _call(self, *args):
+        # a dropped connection (server restart, idle timeout) is reopened once
+        for attempt in range(2):
+            try:
+                if getattr(self._local, "sock", None) is None:
+                    self._connect()
+                return self._send(*args)
+            except OSError:
+                self._disconnect()
+                if attempt:
+                    raise
+
+    def get(self, key):
+        blob = self._call("GET", key)
+        if blob is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return blob
+
+    def put(self, key, blob):
+        self._call("SET", key, blob, "EX", self.ttl)
+
+    def acquire(self, key, seconds):
+        return self._call("SET", f"lock:{key}", "1", "NX", "PX", int(seconds * 1000)) == "OK"
+
+    def release(self, key):
+        self._call("DEL", f"lock:{key}")
+
+    def clear(self):
+        self._call("FLUSHDB")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": self._call("DBSIZE")}
+
+
+class NullCache:
+    hits = misses = 0
+
+    def get(self, key):
+        return None
+
+    def put(self, key, blob):
+        pass
+
+    def acquire(self, key, seconds):
+        return True
+
+    def release(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"hits": 0, "misses": 0, "entries": 0}
+
+
+def _make(backend=BACKEND):
+    if backend == "disk":
+        return DiskCache(os.path.join(tp_data.STORE_DIR, "shared_cache.sqlite"))
+    if backend == "redis":
+        return RedisCache(URL)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"TP_CACHE_BACKEND must be disk, redis or none, not {backend!r}")
+
+
+CACHE = _make()
+ENABLED = not isinstance(CACHE, NullCache)
+
+
+def get(key):
+    """The value cached under `key`, or None. A failing backend counts as a miss."""
+    if not ENABLED:
+        return None
+    try:
+        blob = CACHE.get(f"{RELEASE}:{key}")
+        return None if blob is None else pickle.loads(blob)
+    except Exception:
+        log.warning("shared cache get %s failed", key, exc_info=True)
+        return None
+
+
+def put(key, value):
+    if not ENABLED:
+        return
+    try:
+        CACHE.put(f"{RELEASE}:{key}", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        log.warning("shared cache put %s failed", key, exc_info=True)
+
+
+def claim(key, wait=LOCK_SECONDS):
+    """(cached value, False) if `key` is cached (by now), else (None, whether this process should build it).
+
+    While another process holds the claim this waits for its value, up to
+    `wait` seconds; after that the caller builds it too. A claim that was
+    granted must be given back with `release` once the value is `put`.
+    """
+    if not ENABLED:
+        return None, False
+    deadline = time.monotonic() + wait
+    while True:
+        value = get(key)
+        if value is not None:
+            return value, False
+        try:
+            if CACHE.acquire(f"{RELEASE}:{key}", LOCK_SECONDS):
+                # the holder may have put the value just before letting go
+                value = get(key)
+                if value is not None:
+                    CACHE.release(f"{RELEASE}:{key}")
+                    return value, False
+                return None, True
+        except Exception:
+            log.warning("shared cache lock %s failed", key, exc_info=True)
+            return None, False
+        if time.monotonic() >= deadline:
+            return None, False
+        time.sleep(_POLL)
+
+
+def release(key):
+    try:
+        CACHE.release(f"{RELEASE}:{key}")
+    except Exception:
+        log.warning("shared cache unlock %s failed", key, exc_info=True)
+
+
+def compute(key, build):
+    """The value under `key`, built by `build()` once across every process sharing the cache."""
+    value, held = claim(key)
+    if value is not None:
+        return value
+    try:
+        value = build()
+        put(key, value)
+        return value
+    finally:
+        if held:
+            release(key)
+
+
+def stats():
+    try:
+        return dict(CACHE.stats(), backend=BACKEND, release=RELEASE)
+    except Exception as exc:
+        return {"hits": CACHE.hits, "misses": CACHE.misses, "entries": None, "backend": BACKEND,
+                "error": repr(exc)}
+
+
+class StubHandler(socketserver.StreamRequestHandler):
+    """A Redis stand-in with the commands `RedisCache` sends (GET, SET with EX/PX/NX, DEL, ...)."""
+
+    data = {}  # key -> (value, expires or None)
+    lock = threading.Lock()
+
+    def _read(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _execute(self, command, args):
+        now = time.time()
+        with self.lock:
+            for key in [k for k, (_, expires) in self.data.items() if expires is not None and expires <= now]:
+                del self.data[key]
+            if command == b"PING":
+                return b"+PONG\r\n"
+            if command in (b"AUTH", b"SELECT"):
+                return b"+OK\r\n"
+            if command == b"GET":
+                return self._bulk(self.data.get(args[0], (None,))[0])
+            if command == b"SET":
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                if b"NX" in options and key in self.data:
+                    return b"$-1\r\n"
+                expires = None
+                for unit, scale in ((b"EX", 1), (b"PX", 0.001)):
+                    if unit in options:
+                        expires = now + int(options[options.index(unit) + 1]) * scale
+                self.data[key] = (value, expires)
+                return b"+OK\r\n"
+            if command == b"DEL":
+                return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in args)
+            if command == b"DBSIZE":
+                return b":%d\r\n" % len(self.data)
+            if command == b"FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    def handle(self):
+        while (request := self._read()) is not None:
+            self.wfile.write(self._execute(request[0].upper(), request[1:]))
+
+
+def serve_stub(port=6390):
+    """Serve a Redis stand-in on `port` until interrupted (see `StubHandler`)."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    print(f"Redis stand-in on redis://127.0.0.1:{server.server_address[1]}/0")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    stub = commands.add_parser("stub", help="serve a local Redis stand-in")
+    stub.add_argument("--port", type=int, default=6390)
+    commands.add_parser("stats", help="print the configured backend's statistics")
+    commands.add_parser("clear", help="drop every entry of the configured backend")
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        serve_stub(args.port)
+    elif args.command == "stats":
+        print(stats())
+    else:
+        CACHE.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import threading
+
+import pandas as pd
+
+import tp_data
+import tp_profile
+
+# "pandas": pages aggregate frames loaded into memory. "duckdb": the aggregations
+# run as SQL over the parquet store in place, on all cores, spilling to disk
+# when they outgrow the memory limit. Needs duckdb and the pyarrow-built store.
+BACKEND = os.environ.get("TP_BACKEND", "pandas")
+
+# duckdb takes a while to import, so only the duckdb backend imports it
+HAS_DUCKDB = False
+if BACKEND == "duckdb":
+    try:
+        import duckdb
+        HAS_DUCKDB = True
+    except ImportError:
+        pass
+ENABLED = BACKEND == "duckdb" and HAS_DUCKDB and tp_data.HAS_PYARROW
+# Optional DuckDB memory limit, e.g. "4GB" (defaults to 80% of RAM)
+MEMORY_LIMIT = os.environ.get("TP_DUCKDB_MEMORY")
+
+# The store of one dataset; `month` is the hive partition, so a filter on it skips whole files
+_FROM = "read_parquet($files, hive_partitioning = true, hive_types = {'month': VARCHAR})"
+_INTEGER_TYPES = {"TINYINT", "SMALLINT", "INTEGER", "BIGINT", "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT"}
+
+_db = None
+_db_lock = threading.Lock()
+_local = threading.local()
+
+
+def _cursor():
+    """Cursor for the calling thread on one shared in-memory database."""
+    global _db
+    cursor = getattr(_local, "cursor", None)
+    if cursor is None:
+        with _db_lock:
+            if _db is None:
+                config = {"temp_directory": os.path.join(tp_data.STORE_DIR, ".duckdb_tmp")}
+                if MEMORY_LIMIT:
+                    config["memory_limit"] = MEMORY_LIMIT
+                _db = duckdb.connect(config=config)
+        cursor = _local.cursor = _db.cursor()
+    return cursor
+
+
+def _q(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+@tp_profile.timed("sql")
+def _query(name, sql, params=None, since=None, where=None):
+    """Run `sql` over the store of dataset `name`; ``{source}`` and ``{where}`` are filled in.
+
+    `where` is an extra SQL condition; `since` keeps rows dated on/after it.
+    """
+    tp_data.refresh(name)
+    params = dict(params or {}, files=tp_data.parquet_glob(name))
+    terms = [where] if where else []
+    if since is not None:
+        since = pd.Timestamp(since)
+        terms += [f"month >= $since_month AND {_q(tp_data.DATASETS[name]['date'])} >= $since"]
+        params.update(since_month=since.strftime("%Y-%m"), since=since.to_pydatetime())
+    where = " AND ".join(f"({t})" for t in terms) or "TRUE"
+    return _cursor().execute(sql.format(source=_FROM, where=where), params).df()
+
+
+def columns(name):
+    """Column name -> DuckDB type of a dataset's store."""
+    described = _query(name, "DESCRIBE SELECT * FROM {source}")
+    return {c: t for c, t in zip(described["column_name"], described["column_type"]) if c != "month"}
+
+
+def daily_cube(name, dims=(), measures=(), where=None):
+    """Same frame as `tp_rollup.build_daily_cube` over the whole dataset, computed by DuckDB."""
+    date = _q(tp_data.DATASETS[name]["date"])
+    types = columns(name)
+    keys = [f"date_trunc('day', {date})::TIMESTAMP AS DAY", *(_q(d) for d in dims)]
+    stats = ["COUNT(*) AS n"]
+    for m in measures:
+        total = "BIGINT" if types[m] in _INTEGER_TYPES else "DOUBLE"
+        # like tp_data.widen: a FLOAT goes through its shortest decimal, so 7.8 sums as 7.8
+        wide = f"{_q(m)}::VARCHAR::DOUBLE" if types[m] == "FLOAT" else _q(m)
+        stats += [f"COUNT({_q(m)}) AS {_q(m + '__count')}",
+                  f"COALESCE(SUM({wide}), 0)::{total} AS {_q(m + '__sum')}",
+                  f"COALESCE(SUM({wide}::DOUBLE * {wide}), 0) AS {_q(m + '__sumsq')}",
+                  f"MIN({wide})::{total} AS {_q(m + '__min')}",
+                  f"MAX({wide})::{total} AS {_q(m + '__max')}"]
+    order = ", ".join(f"{i} NULLS LAST" for i in range(1, len(keys) + 1))
+    cube = _query(name, f"SELECT {', '.join(keys + stats)} FROM {{source}} WHERE {{where}} "
+                        f"GROUP BY ALL ORDER BY {order}", where=" AND ".join(filter(None, [f"{date} IS NOT NULL", where])))
+    return cube.astype({"DAY": "datetime64[ns]", **{d: "category" for d in dims}})
+
+
+def top_counts(name, column, n, since=None, where=None):
+    """`value_counts().nlargest(n)` of a column, counted in the store."""
+    counts = _query(name, f"SELECT {_q(column)} AS value, COUNT(*) AS count FROM {{source}} "
+                          f"WHERE {{where}} AND {_q(column)} IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT $n",
+                    {"n": n}, since, where)
+    return pd.Series(counts["count"].values, index=pd.Index(counts["value"], name=column), name="count")
+
+
+def daily_counts(name, since=None, where=None):
+    """Rows per day (indexed by the dataset's date column), counted in the store."""
+    date = _q(tp_data.DATASETS[name]["date"])
+    counts = _query(name, f"SELECT date_trunc('day', {date})::TIMESTAMP AS day, COUNT(*) AS count FROM {{source}} "
+                          f"WHERE {{where}} AND {date} IS NOT NULL GROUP BY 1 ORDER BY 1", since=since, where=where)
+    index = pd.DatetimeIndex(counts["day"].astype("datetime64[ns]"), name=tp_data.DATASETS[name]["date"])
+    return pd.Series(counts["count"].values, index=index, name="count")
+
+
+def corr(name, cols, since=None, where=None):
+    """Pairwise Pearson correlation matrix of `cols` (like `DataFrame.corr`), computed in the store."""
+    pairs = [(a, b) for i, a in enumerate(cols) for b in cols[i + 1:]]
+    select = ", ".join(f"corr({_q(a)}, {_q(b)})" for a, b in pairs)
+    row = _query(name, f"SELECT {select} FROM {{source}} WHERE {{where}}", since=since, where=where).iloc[0]
+    matrix = pd.DataFrame(1.0, index=list(cols), columns=list(cols))
+    for (a, b), value in zip(pairs, row.values):
+        matrix.loc[a, b] = matrix.loc[b, a] = value
+    return matrix
@@ -0,0 +1,150 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import tp_data
+import tp_loaders
+import tp_profile
+import tp_rollup
+
+# Per-day value counters of a dataset's categorical columns, so top-N lists
+# and flag trends are summed from days instead of rescanning the rows.
+# "approximate" columns keep only their heaviest values per day when
+# TP_TOPN_CAPACITY is set (see `count_days`).
+COUNTERS = {
+    "candidate_info": {
+        "columns": ["CAMPAIGNTITLE", "SOURCE", "ASSIGNEDMANAGER", "FOLDER", "COMPLETIONMETHOD", "CAMPAIGN_TYPE",
+                    "CAMPAIGN_SITE", "REPEATAPPLICATION"],
+        "approximate": ["CAMPAIGNTITLE"],
+    },
+}
+# Values kept per day for the "approximate" columns; 0 keeps every count exact
+CAPACITY = int(os.environ.get("TP_TOPN_CAPACITY", 0))
+
+
+def _truncate(counts, column, capacity):
+    """Keep the `capacity` largest counts of each day; also returns the largest dropped count per day."""
+    rank = counts.groupby("DAY")["n"].rank(method="first", ascending=False)
+    dropped = counts[rank > capacity].groupby("DAY")["n"].max()
+    return counts[rank <= capacity].reset_index(drop=True), dropped
+
+
+def count_days(df, date_col, columns, capacity=None):
+    """Rows per (day, value) of every column, in one pass over each column's categorical codes.
+
+    Returns {column: (counts, dropped)}: `counts` has DAY, the value and `n`
+    (missing values are not counted). For columns in `capacity` (column ->
+    values kept per day) only the heaviest values of each day are kept, and
+    `dropped` holds the largest count left out per day: a value missing from
+    a day undercounts it by at most that much. `dropped` is None when exact.
+    """
+    capacity = capacity or {}
+    df = df[df[date_col].notna()]
+    day_codes, days = pd.factorize(df[date_col].dt.normalize(), sort=True)
+    day_codes = day_codes.astype(np.int64)
+    out = {}
+    for col in columns:
+        values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+        categories = values.cat.categories
+        codes = values.cat.codes.to_numpy()
+        present = codes >= 0
+        width = max(len(categories), 1)
+        key = day_codes[present] * width + codes[present]
+        if len(days) * width <= 4 * len(key) + 4096:
+            counts = np.bincount(key, minlength=len(days) * width)
+            key = np.flatnonzero(counts)
+            counts = counts[key]
+        else:  # too many (day, value) cells for a dense table
+            key, counts = np.unique(key, return_counts=True)
+        frame = pd.DataFrame({"DAY": days[key // width], col: pd.Categorical.from_codes(key % width, categories),
+                              "n": counts.astype(np.int64)})
+        out[col] = _truncate(frame, col, capacity[col]) if col in capacity else (frame, None)
+    return out
+
+
+def _merge(entry, delta, col, capacity):
+    counts = tp_rollup.merge_cubes(entry[0], delta[0], dims=[col])
+    dropped = entry[1]
+    if delta[1] is not None:
+        dropped = delta[1] if dropped is None else dropped.add(delta[1], fill_value=0)
+    if capacity:
+        counts, extra = _truncate(counts, col, capacity)
+        dropped = extra if dropped is None else dropped.add(extra, fill_value=0)
+    return counts, dropped
+
+
+def _drop_from(entry, cutoff):
+    counts, dropped = entry
+    return counts[counts["DAY"] < cutoff], None if dropped is None else dropped[dropped.index < cutoff]
+
+
+_counters = {}  # dataset -> (dataset version, {column: (counts, dropped)})
+_lock = threading.Lock()
+
+
+@tp_profile.timed("counters")
+def get_counters(name):
+    """Daily counters for the current version of a dataset, built once per refresh."""
+    spec = COUNTERS[name]
+    capacity = {c: CAPACITY for c in spec.get("approximate", [])} if CAPACITY else {}
+    date_col = tp_data.DATASETS[name]["date"]
+    return tp_loaders.summarise(
+        "counters", _counters, _lock, name, name,
+        lambda rows: count_days(rows, date_col, spec["columns"], capacity),
+        lambda counters, cutoff: {c: _drop_from(entry, cutoff) for c, entry in counters.items()},
+        lambda counters, delta: {c: _merge(entry, delta[c], c, capacity.get(c)) for c, entry in counters.items()})
+
+
+def _plain(counts):
+    counts = counts[counts > 0]
+    return pd.Series(counts.values, index=pd.Index(counts.index.astype(object), name=counts.index.name))
+
+
+def top_counts(name, tops, since=None):
+    """{column: n} -> {column: `value_counts().nlargest(n)`} of the rows dated on/after `since`.
+
+    Whole days are summed from the daily counters; only the rows of the day
+    `since` falls in are counted directly. Counts of approximate columns are
+    lower bounds (see `error_bound`).
+    """
+    counters = get_counters(name)
+    first, partial = tp_loaders.split_window(name, since)
+    out = {}
+    for col, n in tops.items():
+        counts = counters[col][0]
+        if first is not None:
+            counts = counts[counts["DAY"] >= first]
+        categories = counts[col].cat.categories
+        summed = np.bincount(counts[col].cat.codes.to_numpy(), weights=counts["n"].to_numpy(),
+                             minlength=len(categories))
+        total = _plain(pd.Series(summed.astype(np.int64), index=categories))
+        if partial is not None and len(partial):
+            total = total.add(_plain(partial[col].value_counts()), fill_value=0).astype(np.int64)
+        out[col] = total.rename("count").rename_axis(col).nlargest(n)
+    return out
+
+
+def daily_counts(name, column, value, since=None):
+    """Rows per day (indexed by the dataset's date column) with `column` equal to `value`."""
+    counts = get_counters(name)[column][0]
+    first, partial = tp_loaders.split_window(name, since)
+    if first is not None:
+        counts = counts[counts["DAY"] >= first]
+    daily = counts.loc[counts[column] == value].set_index("DAY")["n"]
+    if partial is not None:
+        hits = partial[tp_data.DATASETS[name]["date"]][partial[column] == value]
+        if len(hits):
+            daily = pd.concat([pd.Series([len(hits)], index=[first - pd.Timedelta(days=1)]), daily])
+    index = pd.DatetimeIndex(daily.index, name=tp_data.DATASETS[name]["date"])
+    return pd.Series(daily.values.astype(np.int64), index=index, name="count")
+
+
+def error_bound(name, column, since=None):
+    """Most an approximate column's windowed counts can fall short by (0 when exact)."""
+    dropped = get_counters(name)[column][1]
+    if dropped is None:
+        return 0
+    first, _ = tp_loaders.split_window(name, since)
+    return int(dropped.sum() if first is None else dropped[dropped.index >= first].sum())